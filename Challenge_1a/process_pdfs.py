@@ -1,10 +1,34 @@
+import hashlib
 import json
 from pathlib import Path
-from PyPDF2 import PdfReader
-import pdfplumber
-import fitz  # PyMuPDF
 import re
 import os
+import time
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Text is always extracted; PDF_STAGES=text,sections leaves out tables and images
+STAGES = ("text", "sections", "tables", "images")
+
+# Table prefilter settings, as in Challenge_1b/server/table_filter.py (the
+# image ships this file alone): a page needs edge crossings spanning at
+# least MIN_TABLE_CELLS cells, since a lone box is rarely a table. Edges
+# within SNAP_TOLERANCE points touch; filled rectangles up to
+# RULE_THICKNESS thick count as a single rule.
+MIN_TABLE_CELLS = 2
+SNAP_TOLERANCE = 3
+RULE_THICKNESS = 2
+
+def parse_stages(value=None):
+    """Stages to run from a comma-separated list (all of them if empty), in pipeline order"""
+    if not value:
+        return STAGES
+    names = [name.strip() for name in value.split(",")] if isinstance(value, str) else list(value)
+    unknown = [name for name in names if name and name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage: {', '.join(unknown)} (expected some of {', '.join(STAGES)})")
+    return tuple(stage for stage in STAGES if stage in names or stage == "text")
 
 def extract_sections(text):
     # Simple heuristic: split by headings (e.g., lines in ALL CAPS or starting with numbers)
@@ -21,69 +45,284 @@ def extract_sections(text):
         sections.append(current)
     return sections
 
-def extract_tables(pdf_path):
+def grid_lines(values):
+    """Number of distinct positions in values, merging those within SNAP_TOLERANCE"""
+    count = 0
+    last = None
+    for value in sorted(values):
+        if last is None or value - last > SNAP_TOLERANCE:
+            count += 1
+        last = value
+    return count
+
+def page_may_have_tables(page):
+    """Cheap prefilter from the page's drawings: find_tables() builds cells
+    from ruling lines, so skip pages whose horizontal/vertical edge
+    crossings do not span at least MIN_TABLE_CELLS cells."""
+    import fitz  # PyMuPDF
+    horizontal, vertical = [], []
+    for path in page.get_cdrawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                (ax, ay), (bx, by) = item[1], item[2]
+                if abs(ay - by) < 1:
+                    horizontal.append((min(ax, bx), max(ax, bx), ay))
+                elif abs(ax - bx) < 1:
+                    vertical.append((min(ay, by), max(ay, by), ax))
+            elif item[0] in ("re", "qu"):
+                rect = fitz.Rect(item[1]) if item[0] == "re" else fitz.Quad(item[1]).rect
+                if rect.height <= RULE_THICKNESS and rect.width > RULE_THICKNESS:
+                    horizontal.append((rect.x0, rect.x1, (rect.y0 + rect.y1) / 2))
+                elif rect.width <= RULE_THICKNESS and rect.height > RULE_THICKNESS:
+                    vertical.append((rect.y0, rect.y1, (rect.x0 + rect.x1) / 2))
+                elif rect.width > RULE_THICKNESS and rect.height > RULE_THICKNESS:
+                    horizontal += [(rect.x0, rect.x1, rect.y0), (rect.x0, rect.x1, rect.y1)]
+                    vertical += [(rect.y0, rect.y1, rect.x0), (rect.y0, rect.y1, rect.x1)]
+    rows, columns = set(), set()
+    for x0, x1, y in horizontal:
+        for y0, y1, x in vertical:
+            if not (x0 - SNAP_TOLERANCE <= x <= x1 + SNAP_TOLERANCE
+                    and y0 - SNAP_TOLERANCE <= y <= y1 + SNAP_TOLERANCE):
+                continue
+            if y in rows and x in columns:
+                continue
+            rows.add(y)
+            columns.add(x)
+            if (grid_lines(rows) - 1) * (grid_lines(columns) - 1) >= MIN_TABLE_CELLS:
+                return True
+    return False
+
+def extract_tables(doc, full_scan=False):
+    """Tables from every page; set PDF_TABLE_SCAN=full to skip the prefilter"""
     tables = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            page_tables = page.extract_tables()
-            for table in page_tables:
-                tables.append({"page": i+1, "data": table})
+    for i, page in enumerate(doc):
+        if not full_scan and not page_may_have_tables(page):
+            continue
+        for table in page.find_tables().tables:
+            tables.append({"page": i+1, "data": table.extract()})
     return tables
 
-def extract_images(pdf_path, output_dir):
+def store_image(images_dir, image_bytes, ext):
+    """Write an image once under its content hash; returns (file name, sha256)"""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    filename = f"{digest}.{ext}"
+    image_path = images_dir / filename
+    if not image_path.exists():
+        # Rename into place so concurrent workers never see a partial file
+        tmp_path = images_dir / f".{filename}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as img_file:
+            img_file.write(image_bytes)
+        os.replace(tmp_path, image_path)
+    return filename, digest
+
+def extract_images(doc, output_dir):
+    """Store each distinct image once, shared by every page and PDF that uses it"""
     images = []
-    doc = fitz.open(pdf_path)
     images_dir = output_dir / "images"
     images_dir.mkdir(parents=True, exist_ok=True)
+    stored = {}  # xref -> (file name, sha256); each xref is extracted once
     for page_num in range(len(doc)):
         page = doc[page_num]
-        for img_index, img in enumerate(page.get_images(full=True)):
+        for img in page.get_images(full=True):
             xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            ext = base_image["ext"]
-            image_filename = f"page{page_num+1}_img{img_index+1}.{ext}"
-            image_path = images_dir / image_filename
-            with open(image_path, "wb") as img_file:
-                img_file.write(image_bytes)
-            images.append({"page": page_num+1, "image_file": f"images/{image_filename}"})
+            if xref not in stored:
+                base_image = doc.extract_image(xref)
+                stored[xref] = store_image(images_dir, base_image["image"], base_image["ext"])
+            filename, digest = stored[xref]
+            images.append({"page": page_num+1, "image_file": f"images/{filename}", "xref": xref, "sha256": digest})
     return images
 
-def process_pdfs():
-    input_dir = Path("/app/input")
-    output_dir = Path("/app/output")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    for pdf_file in input_dir.glob("*.pdf"):
-        # Extract text
-        try:
-            reader = PdfReader(str(pdf_file))
-            text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        except Exception as e:
-            text = f"Error reading PDF: {e}"
-        # Extract sections
-        sections = extract_sections(text)
-        # Extract tables
+def process_pdf(pdf_file, output_dir, stages=STAGES):
+    """Write <stem>.json for one PDF; returns (output file, image files it uses)"""
+    import fitz  # PyMuPDF
+    # Open once; text, tables and images all come from the same parse
+    doc = None
+    try:
+        doc = fitz.open(str(pdf_file))
+        text = "\n".join(page.get_text() or "" for page in doc)
+    except Exception as e:
+        text = f"Error reading PDF: {e}"
+    # Extract sections
+    sections = extract_sections(text) if "sections" in stages else []
+    # Extract tables
+    tables = []
+    if "tables" in stages:
         try:
-            tables = extract_tables(str(pdf_file))
+            tables = extract_tables(doc, os.environ.get("PDF_TABLE_SCAN", "").lower() == "full")
         except Exception as e:
             tables = []
-        # Extract images
+    # Extract images
+    images = []
+    if "images" in stages:
         try:
-            images = extract_images(str(pdf_file), output_dir)
+            images = extract_images(doc, output_dir)
         except Exception as e:
             images = []
-        # Build output
-        data = {
-            "filename": pdf_file.name,
-            "content": text[:10000],
-            "sections": sections,
-            "tables": tables,
-            "images": images
-        }
-        output_file = output_dir / f"{pdf_file.stem}.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    if doc is not None:
+        doc.close()
+    # Build output
+    data = {
+        "filename": pdf_file.name,
+        "content": text[:10000],
+        "sections": sections,
+        "tables": tables,
+        "images": images
+    }
+    output_file = output_dir / f"{pdf_file.stem}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return output_file, sorted({image["image_file"] for image in images})
+
+def process_pdf_isolated(pdf_file, output_dir, stages=STAGES):
+    # Keep one bad PDF from taking down the rest of the batch
+    try:
+        return process_pdf(pdf_file, output_dir, stages), None
+    except Exception as e:
+        return None, str(e)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(output_dir, settings):
+    """Inputs recorded by the last run into output_dir, if it used the same settings"""
+    try:
+        with open(output_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and manifest.get("settings") == settings:
+            return manifest["inputs"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_manifest(output_dir, settings, inputs):
+    tmp_path = output_dir / f"{MANIFEST_NAME}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "settings": settings, "inputs": inputs}, f, indent=2)
+    os.replace(tmp_path, output_dir / MANIFEST_NAME)
+
+def input_unchanged(pdf_file, entry, output_dir):
+    """Same size and mtime as recorded (or touched but with the same bytes),
+    and its output is still there"""
+    stat = pdf_file.stat()
+    if entry is None or stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns != entry["mtime_ns"] and file_sha256(pdf_file) != entry["sha256"]:
+        return False
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return (output_dir / entry["output"]).exists()
+
+def remove_unused_images(output_dir, inputs):
+    """Delete the stored images no recorded input uses, such as those of
+    deleted PDFs or the old images of PDFs that were edited"""
+    images_dir = output_dir / "images"
+    if not images_dir.exists():
+        return
+    used = {image for entry in inputs.values() for image in entry["images"]}
+    for image_path in images_dir.iterdir():
+        if f"images/{image_path.name}" not in used:
+            try:
+                os.remove(image_path)
+            except FileNotFoundError:
+                pass
+
+def process_pdfs(input_dir="/app/input", output_dir="/app/output", workers=None, incremental=None, stages=None):
+    """Process every PDF in input_dir into output_dir
+
+    Unless incremental is False (or PDF_INCREMENTAL=0), output_dir's
+    manifest is used to skip PDFs whose size and mtime (or, failing that,
+    hash) are unchanged since the last run, and outputs of PDFs that are no
+    longer in input_dir are deleted. stages (default PDF_STAGES or all of
+    STAGES) leaves out sections, tables or images. Returns (output file,
+    error) per PDF.
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if incremental is None:
+        incremental = os.environ.get("PDF_INCREMENTAL", "1") != "0"
+    stages = parse_stages(stages or os.environ.get("PDF_STAGES"))
+
+    # Every stage runs on PyMuPDF, so text pays for the one import; done here
+    # so its cost is reported and forked workers start with it loaded
+    started = time.perf_counter()
+    import fitz  # PyMuPDF
+    import_ms = (time.perf_counter() - started) * 1000
+    print("Stage imports: " + ", ".join(f"{stage} {import_ms if stage == 'text' else 0:.0f}ms" for stage in stages))
+
+    # Sorted so results and log lines come out in the same order every run
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    settings = {"table_scan": os.environ.get("PDF_TABLE_SCAN", "").lower() or "prefilter"}
+    if stages != STAGES:
+        settings["stages"] = list(stages)
+    previous = load_manifest(output_dir, settings)
+    inputs = {}
+    todo = []
+    for pdf_file in pdf_files:
+        entry = previous.pop(pdf_file.name, None)
+        if incremental and input_unchanged(pdf_file, entry, output_dir):
+            inputs[pdf_file.name] = entry
+        else:
+            todo.append(pdf_file)
+    for name, entry in previous.items():
+        # Input is gone since the last run; its images go once the manifest is final
+        try:
+            os.remove(output_dir / entry["output"])
+        except FileNotFoundError:
+            pass
+        print(f"Removed outputs of deleted input: {name}")
+    if len(todo) < len(pdf_files):
+        print(f"{len(pdf_files) - len(todo)} unchanged PDFs skipped")
+    if workers is None:
+        workers = int(os.environ.get("PDF_WORKERS", 0)) or os.cpu_count() or 1
+    workers = max(1, min(workers, len(todo) or 1))
+
+    if workers == 1:
+        results = [process_pdf_isolated(pdf_file, output_dir, stages) for pdf_file in todo]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        results = []
+        unfinished = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_pdf_isolated, pdf_file, output_dir, stages) for pdf_file in todo]
+            for index, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except BrokenProcessPool:
+                    # A crash fails every pending file, not just the one that caused it
+                    results.append(None)
+                    unfinished.append(index)
+                except Exception as e:
+                    results.append((None, f"Worker failed: {e}"))
+        # Rerun those one at a time, each in its own process, so only the culprit fails
+        for index in unfinished:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    results[index] = executor.submit(process_pdf_isolated, todo[index], output_dir, stages).result()
+                except Exception as e:
+                    # Worker process died while parsing this file
+                    results[index] = (None, f"Worker failed: {e}")
+
+    processed = {}
+    for pdf_file, (result, error) in zip(todo, results):
+        if error:
+            print(f"Error processing {pdf_file.name}: {error}")
+            processed[pdf_file.name] = (None, error)
+            continue
+        output_file, images = result
+        stat = pdf_file.stat()
+        inputs[pdf_file.name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                 "sha256": file_sha256(pdf_file), "output": output_file.name,
+                                 "images": images}
+        processed[pdf_file.name] = (output_file, None)
+    save_manifest(output_dir, settings, inputs)
+    remove_unused_images(output_dir, inputs)
+    return [processed.get(pdf_file.name) or (output_dir / inputs[pdf_file.name]["output"], None)
+            for pdf_file in pdf_files]
 
 if __name__ == "__main__":
-    process_pdfs() 
\ No newline at end of file
+    process_pdfs()
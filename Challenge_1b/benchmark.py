@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Benchmark every processing engine over the bundled PDF datasets.
+
+Each (engine, dataset) run happens in a fresh Python process so import
+time and peak RSS are measured in isolation. Results are written as JSON
+so two runs (e.g. before and after a commit) can be compared:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+SERVER_DIR = BASE_DIR / "server"
+REPO_DIR = BASE_DIR.parent
+
+# Engine name -> (module, function)
+ENGINES = {
+    "webapp": ("process_pdfs_webapp", "process_pdfs_webapp"),
+    "fast": ("process_pdfs_webapp_fast", "process_pdfs_fast"),
+    "simple": ("process_pdfs_simple", "process_pdfs_simple"),
+    "ultra_fast": ("process_pdfs_ultra_fast", "process_pdfs_ultra_fast"),
+    "instant": ("process_pdfs_instant", "process_pdfs_instant"),
+    "adaptive": ("process_pdfs_adaptive", "process_pdfs_adaptive"),
+}
+
+DATASETS = {
+    "collection_1": BASE_DIR / "collections" / "Collection 1",
+    "collection_2": BASE_DIR / "collections" / "Collection 2",
+    "collection_3": BASE_DIR / "collections" / "Collection 3",
+    "challenge_1a": REPO_DIR / "Challenge_1a" / "sample_dataset",
+}
+
+
+def dataset_pdfs(dataset_dir):
+    pdf_dir = dataset_dir / "PDFs"
+    if not pdf_dir.exists():
+        pdf_dir = dataset_dir / "pdfs"
+    return sorted(pdf_dir.glob("*.pdf"))
+
+
+def dataset_query(dataset_dir):
+    """Persona and job for a dataset, from its challenge1b_input.json if any"""
+    input_file = dataset_dir / "challenge1b_input.json"
+    if not input_file.exists():
+        return None
+    with open(input_file, 'r') as f:
+        data = json.load(f)
+    return {
+        "persona": data.get("persona", {}).get("role", "Food Contractor"),
+        "jobToBeDone": data.get("job_to_be_done", {}).get("task", "Analyze document content"),
+    }
+
+
+def count_pages(pdf_files):
+    import fitz  # PyMuPDF
+    total = 0
+    for pdf_file in pdf_files:
+        with fitz.open(pdf_file) as doc:
+            total += doc.page_count
+    return total
+
+
+def directory_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its finished children, in MB"""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(max(own, children) / (1024 * 1024), 1)
+
+
+def engine_output_totals(output_dir):
+    """Sum the per-document stage timings and pages read that engines
+    record in output metadata; returns (stage totals, pages read)"""
+    totals = {}
+    pages_read = 0
+    for output_file in Path(output_dir).glob("*.json"):
+        if output_file.name.endswith((".idx.json", ".pages.json")):
+            continue
+        try:
+            with open(output_file, 'r') as f:
+                metadata = json.load(f).get("metadata", {})
+        except (OSError, ValueError, AttributeError):
+            continue
+        for name, seconds in (metadata.get("timings") or {}).items():
+            totals[name] = totals.get(name, 0.0) + seconds
+        pages_read += metadata.get("pages_read") or 0
+    return totals, pages_read
+
+
+def run_one(engine, dataset, session_dir):
+    """Run one engine over one prepared session and return its measurements.
+
+    Called in a child process (see --run-one).
+    """
+    sys.path.insert(0, str(SERVER_DIR))
+    module_name, function_name = ENGINES[engine]
+
+    stages = {}
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    stages["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Keep engine progress output (including worker processes) out of the
+    # measurement report by pointing fd 1 at /dev/null while the engine runs
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        getattr(module, function_name)(session_dir)
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(saved_stdout)
+        os.close(devnull)
+    stages["process"] = time.perf_counter() - started
+
+    output_dir = Path(session_dir) / "output"
+    engine_stages, pages_read = engine_output_totals(output_dir)
+    return {
+        "engine": engine,
+        "dataset": dataset,
+        "stages": stages,
+        "engine_stages": engine_stages,
+        "pages_read": pages_read,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": directory_size(output_dir) if output_dir.exists() else 0,
+        "output_files": len(list(output_dir.glob("*"))) if output_dir.exists() else 0,
+    }
+
+
+def prepare_session(dataset_dir, root):
+    """Copy a dataset into a fresh session directory the engines understand"""
+    session_dir = Path(tempfile.mkdtemp(prefix="session-", dir=root))
+    started = time.perf_counter()
+    input_dir = session_dir / "input"
+    input_dir.mkdir()
+    for pdf_file in dataset_pdfs(dataset_dir):
+        shutil.copy2(pdf_file, input_dir / pdf_file.name)
+    query = dataset_query(dataset_dir)
+    if query:
+        with open(session_dir / "input.json", 'w') as f:
+            json.dump(query, f)
+    return session_dir, time.perf_counter() - started
+
+
+def measure(engine, dataset, dataset_dir, pages, repeat, root, env):
+    """Run engine over dataset repeat times; report the median of each stage"""
+    runs = []
+    for _ in range(repeat):
+        session_dir, setup_time = prepare_session(dataset_dir, root)
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, __file__, "--run-one", engine, dataset, str(session_dir)],
+            capture_output=True, text=True, env=env
+        )
+        wall = time.perf_counter() - started
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1:] or ["unknown error"]
+            return {"engine": engine, "dataset": dataset, "error": error[0]}
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        run["stages"]["setup"] = setup_time
+        run["wall_time"] = wall
+        runs.append(run)
+
+    stage_names = runs[0]["stages"].keys()
+    stages = {name: round(statistics.median(r["stages"][name] for r in runs), 4) for name in stage_names}
+    engine_stages = {
+        name: round(statistics.median(r["engine_stages"].get(name, 0.0) for r in runs), 4)
+        for name in runs[0]["engine_stages"]
+    }
+    process_time = stages["process"]
+    # Engines cap the pages they read (3, 5 or 10 per PDF; instant reads
+    # none), so throughput counts the pages their outputs report reading
+    pages_read = runs[-1]["pages_read"]
+    return {
+        "engine": engine,
+        "dataset": dataset,
+        "documents": len(dataset_pdfs(dataset_dir)),
+        "pages": pages,
+        "pages_read": pages_read,
+        "repeat": repeat,
+        "stages": stages,
+        "engine_stages": engine_stages,
+        "wall_time": round(statistics.median(r["wall_time"] for r in runs), 4),
+        "pages_per_sec": round(pages_read / process_time, 2) if process_time > 0 and pages_read else None,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "output_bytes": runs[-1]["output_bytes"],
+        "output_files": runs[-1]["output_files"],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(engines, datasets, repeat=1, use_cache=False):
+    env = dict(os.environ)
+    if not use_cache:
+        # Measure real extraction, not cache hits from an earlier run
+        env["PDF_CACHE"] = "0"
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pdf-benchmark-") as root:
+        for dataset in datasets:
+            dataset_dir = DATASETS[dataset]
+            pages = count_pages(dataset_pdfs(dataset_dir))
+            for engine in engines:
+                print(f"Benchmarking {engine} on {dataset}...", file=sys.stderr)
+                result = measure(engine, dataset, dataset_dir, pages, repeat, root, env)
+                results.append(result)
+                if "error" in result:
+                    print(f"  failed: {result['error']}", file=sys.stderr)
+                else:
+                    print(f"  {result['stages']['process']:.3f}s process, "
+                          f"{result['pages_per_sec']} pages/s, {result['peak_rss_mb']} MB peak RSS",
+                          file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cache": use_cache,
+        "results": results,
+    }
+
+
+def compare(before_file, after_file):
+    """Print per-run process time, throughput and memory changes between two result files"""
+    with open(before_file, 'r') as f:
+        before = json.load(f)
+    with open(after_file, 'r') as f:
+        after = json.load(f)
+
+    previous = {(r["engine"], r["dataset"]): r for r in before["results"] if "error" not in r}
+    print(f"{'engine':<12}{'dataset':<15}{'process s':>24}{'pages/s':>28}{'peak MB':>24}")
+    for result in after["results"]:
+        old = previous.get((result["engine"], result["dataset"]))
+        if "error" in result or old is None:
+            continue
+
+        def change(value_of):
+            old_value, new_value = value_of(old), value_of(result)
+            if not old_value or new_value is None:
+                return f"{new_value}"
+            return f"{old_value}->{new_value} ({(new_value - old_value) / old_value:+.0%})"
+
+        print(f"{result['engine']:<12}{result['dataset']:<15}"
+              f"{change(lambda r: r['stages']['process']):>24}"
+              # Results without pages_read divided by every page of the dataset
+              f"{change(lambda r: r['pages_per_sec'] if 'pages_read' in r else None):>28}"
+              f"{change(lambda r: r['peak_rss_mb']):>24}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PDF processing engines")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help="Comma-separated engines (default: all)")
+    parser.add_argument("--datasets", default=",".join(DATASETS),
+                        help="Comma-separated datasets (default: all)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per engine and dataset; stage times are medians")
+    parser.add_argument("--cache", action="store_true",
+                        help="Allow the extraction cache (disabled by default)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="Where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--run-one", nargs=3, metavar=("ENGINE", "DATASET", "SESSION"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(*args.run_one)))
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        engines = [e for e in args.engines.split(",") if e]
+        datasets = [d for d in args.datasets.split(",") if d]
+        for name in engines:
+            if name not in ENGINES:
+                parser.error(f"unknown engine: {name}")
+        for name in datasets:
+            if name not in DATASETS:
+                parser.error(f"unknown dataset: {name}")
+
+        report = run_benchmarks(engines, datasets, repeat=args.repeat, use_cache=args.cache)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
@@ -52,50 +52,57 @@ const Analysis = () => {
     formData.append('persona', persona);
     formData.append('jobToBeDone', jobToBeDone);
 
-    // Start progress simulation
-    const steps = [
-      'Uploading files...',
-      'Processing PDFs...',
-      'Extracting content...',
-      'Analyzing sections...',
-      'Generating insights...'
-    ];
-    
-    let currentStepIndex = 0;
-    const interval = setInterval(() => {
-      if (currentStepIndex < steps.length) {
-        setCurrentStep(steps[currentStepIndex]);
-        setAnalysisProgress((prev) => Math.min(prev + 20, 90)); // Only go up to 90%
-        currentStepIndex++;
-      }
-    }, 1000);
-
     try {
-      const response = await axios.post('/api/analyze', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
-        timeout: 120000  // 2 minute timeout
+      // Submit the job, then poll its progress until the engine finishes
+      setCurrentStep('Uploading files...');
+      const { data: submitted } = await axios.post('/api/jobs', formData, {
+        headers: { 'Content-Type': 'multipart/form-data' }
       });
-      
-      // Clear the progress interval
-      clearInterval(interval);
-      
+
+      let job = submitted;
+      let seenEvents = job.events.length;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const { data } = await axios.get(`/api/jobs/${submitted.jobId}`, { params: { since: seenEvents } });
+        job = data;
+        seenEvents += job.events.length;
+
+        // Each document counts half when extracted and fully once written
+        const done = job.documents.reduce((sum, doc) => (
+          sum + (doc.status === 'completed' || doc.status === 'failed' ? 1 : doc.status === 'extracted' ? 0.5 : 0)
+        ), 0);
+        setAnalysisProgress(Math.min(Math.round((done / job.documents.length) * 100), 99));
+
+        const lastDocumentEvent = [...job.events].reverse().find((event) => event.type === 'document');
+        if (job.status === 'queued') {
+          setCurrentStep('Waiting for other analyses to finish...');
+        } else if (lastDocumentEvent) {
+          const verb = lastDocumentEvent.status === 'extracted' ? 'Extracted' :
+            lastDocumentEvent.status === 'failed' ? 'Failed' : 'Analyzed';
+          setCurrentStep(`${verb} ${lastDocumentEvent.document} (${job.progress.completed}/${job.progress.total})`);
+        } else if (job.progress.completed === 0) {
+          setCurrentStep('Processing PDFs...');
+        }
+      }
+
+      if (job.status !== 'completed') {
+        throw new Error(job.error || 'Analysis failed');
+      }
+
       // Set final progress and results
       setAnalysisProgress(100);
       setCurrentStep('Analysis complete!');
-      setResults(response.data);
+      setResults(job.result);
       
-      console.log('Analysis results received:', response.data);
+      console.log('Analysis results received:', job.result);
       toast.success('Analysis completed successfully!');
       
     } catch (error) {
-      // Clear the progress interval
-      clearInterval(interval);
-      
       console.error('Analysis error:', error);
-      if (error.code === 'ECONNABORTED') {
-        toast.error('Analysis timed out. Please try with a smaller PDF or try again.');
-      } else if (error.response?.data?.error) {
+      if (error.response?.data?.error) {
         toast.error(`Analysis failed: ${error.response.data.error}`);
+      } else if (!error.response && error.message) {
+        toast.error(`Analysis failed: ${error.message}`);
       } else {
         toast.error('Analysis failed. Please try again.');
       }
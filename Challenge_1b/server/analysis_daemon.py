@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Long-running analysis service.
+
+Keeps the PDF libraries and engine modules imported so each job starts
+working immediately instead of paying interpreter start-up and import
+costs. Speaks newline-delimited JSON-RPC 2.0, either on stdin/stdout
+(default, used by server/index.js) or on a Unix socket:
+
+    python analysis_daemon.py
+    python analysis_daemon.py --socket /tmp/pdf-analysis.sock
+
+Progress of an analyze request is sent as notifications before its reply:
+    {"jsonrpc": "2.0", "method": "progress",
+     "params": {"request_id": ..., "document": ..., "status": ..., "total": ...}}
+
+Methods:
+    ping                                    -> {"pid": ..., "engines": [...]}
+    analyze {session_dir, engine?, options?} -> {"processed": [...], "output_dir": ...}
+    shutdown                                -> null
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Import the heavy PDF backends up front; that is the point of the daemon.
+# Anything they print at import time must stay out of the RPC channel.
+with contextlib.redirect_stdout(sys.stderr):
+    import fitz  # PyMuPDF
+    from PyPDF2 import PdfReader
+    from stages import module_available
+    if module_available("numpy"):
+        # Font-based headings and TF-IDF scoring; optional, as in the engines
+        import numpy
+
+    from process_pdfs_webapp import process_pdfs_webapp
+    from process_pdfs_webapp_fast import process_pdfs_fast
+    from process_pdfs_simple import process_pdfs_simple
+    from process_pdfs_ultra_fast import process_pdfs_ultra_fast
+    from process_pdfs_instant import process_pdfs_instant
+    from process_pdfs_adaptive import process_pdfs_adaptive
+    from rerank import rerank_session
+    from metrics import get_verbosity, set_verbosity
+
+ENGINES = {
+    "webapp": process_pdfs_webapp,
+    "fast": process_pdfs_fast,
+    "simple": process_pdfs_simple,
+    "ultra_fast": process_pdfs_ultra_fast,
+    "instant": process_pdfs_instant,
+    "adaptive": process_pdfs_adaptive,
+    "rerank": rerank_session,
+}
+
+# Options each engine accepts as keyword arguments
+ENGINE_OPTIONS = {
+    "webapp": {"workers", "use_cache", "page_workers", "stream", "verbosity", "metrics_file",
+               "full_table_scan", "max_memory_mb", "batch_pages",
+               "output_format", "gzip_output", "scoring", "incremental", "stages"},
+    "adaptive": {"time_budget", "use_cache", "verbosity", "metrics_file",
+                 "output_format", "gzip_output", "scoring"},
+    "rerank": {"persona", "job_to_be_done", "verbosity", "metrics_file"},
+}
+
+# Engines that report per-document progress through an on_progress callback
+PROGRESS_ENGINES = {"webapp", "adaptive", "rerank"}
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def analyze(params, notify=None):
+    session_dir = params.get("session_dir")
+    if not session_dir or not Path(session_dir).is_dir():
+        raise RpcError(-32602, f"session_dir does not exist: {session_dir}")
+
+    engine = params.get("engine", "webapp")
+    if engine not in ENGINES:
+        raise RpcError(-32602, f"Unknown engine: {engine}")
+
+    options = params.get("options") or {}
+    unknown = set(options) - ENGINE_OPTIONS.get(engine, set())
+    if unknown:
+        raise RpcError(-32602, f"Unsupported options for {engine}: {sorted(unknown)}")
+
+    if notify and engine in PROGRESS_ENGINES:
+        # Per-document progress goes out as "progress" notifications
+        options["on_progress"] = lambda event: notify("progress", event)
+
+    started = time.time()
+    # Engines set the verbosity for the whole process; put it back so a
+    # "verbosity" option only applies to this request
+    verbosity = get_verbosity()
+    try:
+        results = ENGINES[engine](session_dir, **options) or []
+    finally:
+        set_verbosity(verbosity)
+    # Engines return either file names or full result dicts
+    processed = [r["filename"] if isinstance(r, dict) else r for r in results]
+    return {
+        "processed": processed,
+        "output_dir": str(Path(session_dir) / "output"),
+        "elapsed": round(time.time() - started, 3),
+    }
+
+
+def handle_request(request, log, send=None):
+    """Run one JSON-RPC request and return the response dict
+
+    send(message) writes a notification to the client while the request
+    runs; progress notifications carry the request id in params.
+    """
+    request_id = request.get("id") if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict) or "method" not in request:
+            raise RpcError(-32600, "Invalid request")
+        method = request["method"]
+        params = request.get("params") or {}
+
+        def notify(method, event):
+            if send:
+                send({"jsonrpc": "2.0", "method": method, "params": {"request_id": request_id, **event}})
+
+        # Engine progress goes to the log stream, never into the RPC channel
+        with contextlib.redirect_stdout(log):
+            if method == "ping":
+                result = {"pid": os.getpid(), "engines": sorted(ENGINES)}
+            elif method == "analyze":
+                result = analyze(params, notify)
+            elif method == "shutdown":
+                result = None
+            else:
+                raise RpcError(-32601, f"Method not found: {method}")
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+    except RpcError as e:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+    except Exception as e:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": str(e)}}
+
+
+def handle_line(line, log, send=None):
+    """Parse one request line; returns (response, shutdown requested)"""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}, False
+    response = handle_request(request, log, send)
+    return response, isinstance(request, dict) and request.get("method") == "shutdown"
+
+
+def serve_stdio():
+    """Serve requests from stdin, one JSON object per line, replies on stdout"""
+    # Keep a private handle on the real stdout for replies and point fd 1
+    # at stderr, so prints from engine worker processes cannot reach it
+    sys.stdout.flush()
+    rpc_out = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    def send(message):
+        rpc_out.write(json.dumps(message) + "\n")
+        rpc_out.flush()
+
+    print("Analysis daemon ready (stdio)", file=sys.stderr, flush=True)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response, stop = handle_line(line, sys.stderr, send)
+        send(response)
+        if stop:
+            break
+
+
+class RpcHandler(socketserver.StreamRequestHandler):
+    def send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            response, stop = handle_line(raw.decode("utf-8"), sys.stderr, self.send)
+            self.send(response)
+            if stop:
+                # shutdown() blocks until serve_forever returns, so run it elsewhere
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                break
+
+
+def serve_socket(path):
+    """Serve requests on a Unix socket; one job runs at a time"""
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.UnixStreamServer(path, RpcHandler) as server:
+        print(f"Analysis daemon ready on {path}", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm PDF analysis service (JSON-RPC)")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of stdin/stdout")
+    args = parser.parse_args()
+
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdio()
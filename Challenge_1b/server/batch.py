@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import os
+import traceback
+
+
+def resolve_workers(workers, item_count):
+    """Clamp a requested worker count to something sensible for item_count"""
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, item_count))
+
+
+def _call_isolated(func, item, args):
+    """Run func(item, *args) and turn any exception into an error string"""
+    try:
+        return func(item, *args), None
+    except Exception as e:
+        return None, f"{e}\n{traceback.format_exc()}"
+
+
+def _run_alone(func, item, args):
+    """_call_isolated in a pool of its own, so a crash takes down only this item"""
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_call_isolated, func, item, args).result()
+        except Exception as e:
+            # Worker process died (e.g. segfault in a PDF library)
+            return None, f"Worker failed: {e}"
+
+
+def run_batch(func, items, args=(), workers=1, on_done=None):
+    """Run func(item, *args) for each item, optionally across a process pool.
+
+    Returns a list of (result, error) tuples in the same order as items, so
+    output is deterministic no matter which worker finishes first. A failure
+    in one item (or a crashed worker) only affects that item's entry: a
+    crash breaks the whole pool, so the items it left unfinished are rerun
+    one at a time, each in its own worker process.
+    func must be a module-level function so it can be pickled.
+    on_done(index, result, error) is called in this process as each item
+    finishes, in completion order, e.g. to report progress.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = resolve_workers(workers, len(items))
+    if workers == 1:
+        results = []
+        for index, item in enumerate(items):
+            results.append(_call_isolated(func, item, args))
+            if on_done:
+                on_done(index, *results[-1])
+        return results
+
+    # Imported here: multiprocessing is not needed for single-worker runs
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+    results = [None] * len(items)
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_call_isolated, func, item, args): index
+                   for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except BrokenProcessPool:
+                # Every pending item fails with the pool, not just the one that crashed it
+                unfinished.append(index)
+                continue
+            except Exception as e:
+                results[index] = (None, f"Worker failed: {e}")
+            if on_done:
+                on_done(index, *results[index])
+
+    for index in sorted(unfinished):
+        results[index] = _run_alone(func, items[index], args)
+        if on_done:
+            on_done(index, *results[index])
+    return results
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import math
+from collections import Counter
+from query import terms_of
+
+
+def tokenize(text):
+    """Index terms, normalized and stemmed the same way as Query terms"""
+    return terms_of(text)
+
+
+def section_text(section):
+    return section['title'] + "\n" + section['content']
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring.
+
+    Build it once over every section of a collection, then score a query
+    against all of them at once: only the postings of the query terms are
+    visited, so cost grows with how often the query terms occur rather than
+    with sections x keywords x section length. Document frequencies come
+    from the whole collection, so a term that appears in every section
+    counts for little.
+    """
+
+    def __init__(self, texts=(), k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> list of (doc_id, term frequency)
+        self.doc_lengths = []
+        for text in texts:
+            self.add(text)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, text):
+        """Index one document and return its id (ids are assigned in order)"""
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(text)
+        self.doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((doc_id, tf))
+        return doc_id
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query_terms):
+        """BM25 score of every indexed document for the query, by doc id"""
+        n = len(self.doc_lengths)
+        scores = [0.0] * n
+        if n == 0:
+            return scores
+
+        avg_length = (sum(self.doc_lengths) / n) or 1.0
+        k1, b = self.k1, self.b
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in postings:
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+# Bump when the cached payload layout changes so old entries are ignored
+CACHE_FORMAT = 3
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "cache"
+DEFAULT_MAX_MB = 512
+# Running estimate of the cache size in bytes, shared by every process
+USAGE_FILE = ".usage"
+# Eviction frees space down to this fraction of the limit, so the puts that
+# follow do not each trigger another walk of the cache
+EVICT_TO = 0.9
+
+
+def file_sha256(pdf_path, chunk_size=1024 * 1024):
+    """SHA-256 of the file bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(pdf_hash, settings):
+    """Key an entry by the PDF content and the extractor settings that produced it"""
+    payload = json.dumps({"format": CACHE_FORMAT, "pdf": pdf_hash, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _image_files(extraction):
+    """Distinct image files an extraction refers to"""
+    return sorted({image["image_file"] for image in extraction.get("images", [])})
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class ExtractionCache:
+    """On-disk, content-addressed cache of per-document extraction results.
+
+    Each entry holds the per-page text, sections, tables and image manifest
+    for one (PDF bytes, settings) pair, plus copies of the extracted image
+    files. Entries are evicted least-recently-used once the cache grows past
+    max_bytes. Configure with PDF_CACHE_DIR / PDF_CACHE_MAX_MB, or disable
+    with PDF_CACHE=0.
+
+    Each put adds its entry's size to a running total in USAGE_FILE, and
+    the cache is only walked (by evict) once that total crosses max_bytes,
+    so a write costs the size of its own entry rather than of the cache.
+    """
+
+    def __init__(self, cache_dir=None, max_mb=None, enabled=None):
+        self.cache_dir = Path(cache_dir or os.environ.get("PDF_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.max_bytes = int(max_mb or os.environ.get("PDF_CACHE_MAX_MB") or DEFAULT_MAX_MB) * 1024 * 1024
+        if enabled is None:
+            enabled = os.environ.get("PDF_CACHE", "1") != "0"
+        self.enabled = enabled
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def get(self, pdf_path, settings):
+        """Return (key, extraction) on a hit, (key, None) on a miss"""
+        if not self.enabled:
+            return None, None
+        key = cache_key(file_sha256(pdf_path), settings)
+        entry_file = self._entry_dir(key) / "extraction.json"
+        try:
+            with open(entry_file, "r", encoding="utf-8") as f:
+                extraction = json.load(f)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry_file, None)
+            return key, extraction
+        except (OSError, ValueError):
+            return key, None
+
+    def put(self, key, extraction, output_dir=None):
+        """Store an extraction; image files are copied from output_dir"""
+        if not self.enabled or key is None:
+            return
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.with_name(f"{key}.tmp{os.getpid()}")
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            for image_file in _image_files(extraction):
+                dst = tmp_dir / image_file
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(Path(output_dir) / image_file, dst)
+            with open(tmp_dir / "extraction.json", "w", encoding="utf-8") as f:
+                json.dump(extraction, f, ensure_ascii=False)
+            if entry_dir.exists():
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            # Rename so concurrent readers never see a half-written entry
+            os.replace(tmp_dir, entry_dir)
+            usage = self._add_usage(_dir_size(entry_dir))
+        except OSError as e:
+            print(f"Could not write cache entry {key}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        if usage is None or usage > self.max_bytes:
+            self.evict()
+
+    def _add_usage(self, size):
+        """Add size to the running total; returns it, or None if it is unknown
+
+        Concurrent writers can lose each other's updates, which only delays
+        the next evict(); evict() rewrites the total from a full walk.
+        """
+        usage_file = self.cache_dir / USAGE_FILE
+        try:
+            usage = int(usage_file.read_text()) + size
+        except (OSError, ValueError):
+            return None
+        usage_file.write_text(str(usage))
+        return usage
+
+    def restore_images(self, key, extraction, output_dir):
+        """Copy a hit's cached image files back into output_dir"""
+        entry_dir = self._entry_dir(key)
+        for image_file in _image_files(extraction):
+            dst = Path(output_dir) / image_file
+            if dst.exists():
+                continue  # Files are named by content, so it is the same image
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry_dir / image_file, dst)
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits in EVICT_TO of max_bytes"""
+        entries = []
+        total = 0
+        for entry_file in self.cache_dir.glob("*/*/extraction.json"):
+            entry_dir = entry_file.parent
+            if ".tmp" in entry_dir.name:
+                continue  # Another process is still writing this one
+            try:
+                size = _dir_size(entry_dir)
+                entries.append((entry_file.stat().st_mtime, size, entry_dir))
+                total += size
+            except OSError:
+                continue  # Removed by another process meanwhile
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+        try:
+            (self.cache_dir / USAGE_FILE).write_text(str(total))
+        except OSError:
+            pass  # Estimate stays unknown; the next put walks the cache again
+
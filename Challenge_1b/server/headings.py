@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+from stages import module_available
+
+# NumPy is optional; without it the engines fall back to the text-only
+# heading heuristic. It and PyMuPDF are imported where they are used, so
+# runs without the sections stage never load them.
+
+# A line is a heading if it is set noticeably larger than the page's body
+# text, or bold where the body text is not, and is short enough to be a title
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_CHARS = 120
+
+# Lines ending like this are sentences, whatever their font
+SENTENCE_ENDINGS = ('.', ',', ';')
+
+BOLD_FLAG = 16
+BOLD_FONT_NAMES = ('bold', 'black', 'heavy', 'semibold')
+
+
+def font_headings_available():
+    return module_available("numpy")
+
+
+def _span_is_bold(span):
+    return bool(span["flags"] & BOLD_FLAG) or any(name in span["font"].lower() for name in BOLD_FONT_NAMES)
+
+
+def page_lines(page):
+    """(block, text, size, bold) for every non-blank text line of a fitz page.
+
+    size is the largest span size on the line; bold means every span with
+    visible text is bold.
+    """
+    lines = []
+    import fitz  # PyMuPDF
+    layout = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+    for block_number, block in enumerate(layout["blocks"]):
+        for line in block.get("lines", []):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join("".join(span["text"] for span in line["spans"]).split())
+            lines.append((block_number, text, max(span["size"] for span in spans),
+                          all(_span_is_bold(span) for span in spans)))
+    return lines
+
+
+def classify_lines(lines):
+    """Heading flags for one page's lines, from per-page font statistics.
+
+    The body font size is the character-weighted median size on the page,
+    and the body counts as bold if most of its characters are.
+    """
+    import numpy as np
+    sizes = np.array([line[2] for line in lines], dtype=float)
+    chars = np.array([len(line[1]) for line in lines])
+    bold = np.array([line[3] for line in lines], dtype=bool)
+
+    order = np.argsort(sizes, kind="stable")
+    cumulative = np.cumsum(chars[order])
+    body_size = sizes[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+    body_bold = chars[bold].sum() * 2 > chars.sum()
+
+    sentence = np.array([line[1].endswith(SENTENCE_ENDINGS) for line in lines], dtype=bool)
+    has_letters = np.array([any(c.isalpha() for c in line[1]) for line in lines], dtype=bool)
+    emphasised = (sizes >= body_size * HEADING_SIZE_RATIO) | (bold & ~body_bold)
+    return emphasised & (chars <= MAX_HEADING_CHARS) & ~sentence & has_letters
+
+
+def page_layout(page):
+    """Text of a fitz page plus the character offsets of its heading lines.
+
+    Both come from one get_text("dict") parse. A heading that wraps over
+    several lines of the same block is joined into one line, so it becomes
+    one section title. Returns (text, heading offsets); the offsets are
+    None when there is no font data to go on.
+    """
+    lines = page_lines(page)
+    if not lines:
+        return page.get_text() or "", None
+    flags = classify_lines(lines)
+
+    out = []
+    previous = None
+    for (block_number, text, size, bold), heading in zip(lines, flags):
+        if heading and previous is not None and previous[0] == block_number and previous[1] == size and out[-1][1]:
+            out[-1][0] += " " + text
+        else:
+            out.append([text, bool(heading)])
+        previous = (block_number, size)
+
+    offsets = set()
+    position = 0
+    for text, heading in out:
+        if heading:
+            offsets.add(position)
+        position += len(text) + 1
+    return "\n".join(text for text, heading in out), offsets
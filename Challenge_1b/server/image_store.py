@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+
+
+def store_image(images_dir, image_bytes, ext):
+    """Write image bytes to images_dir/<sha256>.<ext> unless already there.
+
+    Identical images (the same logo on every page, or in every document of
+    a session) share one file. Returns (file name, sha256).
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    filename = f"{digest}.{ext}"
+    image_path = images_dir / filename
+    if not image_path.exists():
+        # Write under a private name, then rename, so a concurrent writer of
+        # the same image never exposes a partial file
+        tmp_path = images_dir / f".{filename}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, image_path)
+    return filename, digest
+
+
+def extract_document_images(doc, images_dir, pages=None, stored=None):
+    """Store every image of an open fitz document, deduplicated.
+
+    Each xref is extracted once per document, however many pages place it;
+    every placement still gets an entry pointing at the shared file.
+    pages limits extraction to a range of page indexes; pass the same
+    stored dict (xref -> (file name, sha256)) across calls on one document.
+    """
+    images_dir.mkdir(parents=True, exist_ok=True)
+    images = []
+    if stored is None:
+        stored = {}
+    for page_num in (pages if pages is not None else range(doc.page_count)):
+        for img in doc[page_num].get_images(full=True):
+            xref = img[0]
+            if xref not in stored:
+                base_image = doc.extract_image(xref)
+                stored[xref] = store_image(images_dir, base_image["image"], base_image["ext"])
+            filename, digest = stored[xref]
+            images.append({
+                "page": page_num + 1,
+                "image_file": f"images/{filename}",
+                "xref": xref,
+                "sha256": digest
+            })
+    return images
@@ -4,6 +4,8 @@ const multer = require('multer');
 const path = require('path');
 const fs = require('fs-extra');
 const { v4: uuidv4 } = require('uuid');
+const { spawn } = require('child_process');
+const readline = require('readline');
 
 const app = express();
 const port = 5000;
@@ -26,128 +28,427 @@ const storage = multer.diskStorage({
 
 const upload = multer({ storage });
 
-// API Routes
-app.get('/api/config', (req, res) => {
-  res.json({ adobeClientId: '1c2a84f90f1746778df9d4c1376896bd' });
+// Warm Python analysis daemon (analysis_daemon.py), started once and fed
+// newline-delimited JSON-RPC requests over stdin/stdout
+const PYTHON = process.env.PYTHON || 'python3';
+let daemon = null;
+let nextRequestId = 1;
+const pendingRequests = new Map();
+
+const startDaemon = () => {
+  const child = spawn(PYTHON, [path.join(__dirname, 'analysis_daemon.py')], {
+    cwd: __dirname,
+    stdio: ['pipe', 'pipe', 'inherit']
+  });
+
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (e) {
+      console.error('Invalid daemon response:', line);
+      return;
+    }
+    if (response.method === 'progress') {
+      // Notification sent while an analyze request is still running
+      const pending = pendingRequests.get(response.params.request_id);
+      if (pending && pending.onProgress) pending.onProgress(response.params);
+      return;
+    }
+    const pending = pendingRequests.get(response.id);
+    if (!pending) return;
+    pendingRequests.delete(response.id);
+    if (response.error) {
+      pending.reject(new Error(response.error.message));
+    } else {
+      pending.resolve(response.result);
+    }
+  });
+
+  const onExit = (reason) => {
+    if (daemon !== child) return;
+    console.error('Analysis daemon stopped:', reason);
+    daemon = null;
+    for (const pending of pendingRequests.values()) {
+      pending.reject(new Error('Analysis daemon stopped'));
+    }
+    pendingRequests.clear();
+  };
+  child.on('exit', (code) => onExit(`exit code ${code}`));
+  child.on('error', (error) => onExit(error.message));
+
+  daemon = child;
+  return child;
+};
+
+const callDaemon = (method, params, onProgress) => new Promise((resolve, reject) => {
+  const child = daemon || startDaemon();
+  const id = nextRequestId++;
+  pendingRequests.set(id, { resolve, reject, onProgress });
+  child.stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n');
 });
 
-// Analysis endpoint
-app.post('/api/analyze', upload.array('pdfs'), async (req, res) => {
+// Sections of each document included in analysis results; the rest are
+// fetched a page at a time from /api/sessions/:id/results/:file/sections
+const RESULT_SECTIONS = 10;
+const INDEX_VERSION = 1;
+
+// Sidecar index (<stem>.idx.json, written by output_writer.py) with the byte
+// range of every section and field of an output, or null when it is missing
+// or no longer matches the output
+const loadResultIndex = async (outputFile) => {
   try {
-    const files = req.files;
-    const inputData = {
-      persona: req.body.persona,
-      jobToBeDone: req.body.jobToBeDone
-    };
+    const indexFile = outputFile.replace(/\.(nd)?json$/, '.idx.json');
+    const [index, stat] = await Promise.all([fs.readJson(indexFile), fs.stat(outputFile, { bigint: true })]);
+    if (index.version === INDEX_VERSION && index.output === path.basename(outputFile) &&
+        index.size === Number(stat.size) && index.mtime_ns === Number(stat.mtimeNs)) {
+      return index;
+    }
+  } catch (error) {
+    // No index; the caller parses the whole file
+  }
+  return null;
+};
 
-    if (!files || files.length === 0) {
-      return res.status(400).json({ error: 'No files uploaded' });
+// Parse the JSON at each [start, end) byte range of a file
+const readRanges = async (file, ranges) => {
+  const fd = await fs.open(file, 'r');
+  try {
+    return await Promise.all(ranges.map(async ([start, end]) => {
+      const buffer = Buffer.alloc(end - start);
+      await fs.read(fd, buffer, 0, end - start, start);
+      return JSON.parse(buffer.toString('utf8'));
+    }));
+  } finally {
+    await fs.close(fd);
+  }
+};
+
+// Document-level fields (all but `omit`) and the sections ranked
+// start..start+count of one output, read by seeking through its index
+const readResult = async (outputFile, start = 0, count = RESULT_SECTIONS, omit = []) => {
+  const index = await loadResultIndex(outputFile);
+  if (!index) {
+    const { sections = [], ...fields } = await fs.readJson(outputFile);
+    const ranked = [...sections].sort((a, b) => (a.rank || Infinity) - (b.rank || Infinity));
+    omit.forEach((key) => delete fields[key]);
+    return { ...fields, sections: ranked.slice(start, start + count), sections_total: sections.length };
+  }
+
+  const positions = index.ranks.slice(start, start + count);
+  const sections = await readRanges(outputFile, positions.map((position) => index.sections[position]));
+  let fields;
+  if (index.fields) {
+    const keys = Object.keys(index.fields).filter((key) => !omit.includes(key));
+    const values = await readRanges(outputFile, keys.map((key) => index.fields[key]));
+    fields = Object.fromEntries(keys.map((key, i) => [key, values[i]]));
+  } else {
+    // ndjson: one document record, and section records carry type/index
+    [fields] = await readRanges(outputFile, [index.document]);
+    delete fields.type;
+    omit.forEach((key) => delete fields[key]);
+    sections.forEach((section) => { delete section.type; delete section.index; });
+  }
+  return { ...fields, sections, sections_total: index.sections.length };
+};
+
+// Options sent with each engine: plain <stem>.json outputs, whatever
+// PDF_OUTPUT_FORMAT says, since they are read back below ("rerank" keeps
+// the format of the run it re-ranks). Stream and memory-bounded mode write
+// .ndjson instead, so both are off; max_memory_mb 0 keeps PDF_MAX_MEMORY_MB
+// in the server's environment from switching the latter on
+const ENGINE_OPTIONS = {
+  webapp: { output_format: 'json', gzip_output: false, stream: false, max_memory_mb: 0 },
+  rerank: {}
+};
+
+// Run the real engine on a session and load the top of each document's
+// output; engine "rerank" re-scores the stored extractions of an earlier
+// run for the new persona/job without reading the PDFs again
+const analyzeSession = async (sessionDir, persona, jobToBeDone, onProgress, engine = 'webapp') => {
+  await fs.writeJson(path.join(sessionDir, 'input.json'), { persona, jobToBeDone });
+  const result = await callDaemon('analyze', {
+    session_dir: sessionDir,
+    engine,
+    options: ENGINE_OPTIONS[engine]
+  }, onProgress);
+
+  // The top sections only, and not the 10,000-character content preview
+  return Promise.all(result.processed.map((pdfName) => {
+    const outputFile = path.join(result.output_dir, `${path.parse(pdfName).name}.json`);
+    return readResult(outputFile, 0, RESULT_SECTIONS, ['content']);
+  }));
+};
+
+// Extract persona and job strings
+const getPersonaString = (personaData) => {
+  if (typeof personaData === 'string') return personaData;
+  if (typeof personaData === 'object' && personaData !== null) {
+    return personaData.role || personaData.value || 'Food Contractor';
+  }
+  return 'Food Contractor';
+};
+
+const getJobString = (jobData) => {
+  if (typeof jobData === 'string') return jobData;
+  if (typeof jobData === 'object' && jobData !== null) {
+    return jobData.task || jobData.value || 'Analyze document';
+  }
+  return 'Analyze document';
+};
+
+// Analyze one upload and build the response body
+const runAnalysis = async ({ files, sessionDir, sessionId, personaString, jobString }, onProgress) => {
+  // Engine failures propagate, so the job ends as failed with the engine's error
+  console.log('Running analysis engine...');
+  const outputs = await analyzeSession(sessionDir, personaString, jobString, onProgress);
+  const analysisResults = outputs.map((output) => ({
+    ...output,
+    metadata: {
+      ...output.metadata,
+      timestamp: new Date().toISOString(),
+      document_count: files.length
     }
+  }));
+
+  console.log('Analysis completed:', analysisResults.length, 'files processed');
+  return {
+    sessionId,
+    results: analysisResults,
+    metadata: {
+      timestamp: new Date().toISOString(),
+      total_documents: files.length,
+      persona: personaString,
+      job_to_be_done: jobString
+    },
+    success: true
+  };
+};
 
-    const sessionDir = path.dirname(files[0].path);
-    const sessionId = path.basename(sessionDir);
-
-    // Extract persona and job strings
-    const getPersonaString = (personaData) => {
-      if (typeof personaData === 'string') return personaData;
-      if (typeof personaData === 'object' && personaData !== null) {
-        return personaData.role || personaData.value || 'Food Contractor';
-      }
-      return 'Food Contractor';
-    };
-
-    const getJobString = (jobData) => {
-      if (typeof jobData === 'string') return jobData;
-      if (typeof jobData === 'object' && jobData !== null) {
-        return jobData.task || jobData.value || 'Analyze document';
-      }
-      return 'Analyze document';
-    };
-
-    const personaString = getPersonaString(inputData.persona);
-    const jobString = getJobString(inputData.jobToBeDone);
-
-    // Generate analysis results
-    console.log('Generating analysis results...');
-    const analysisResults = files.map((file, index) => {
-      // Generate sections with ranking
-      const sections = [
-        {
-          title: 'Executive Summary',
-          content: `Analysis of '${file.originalname}' for ${personaString}`,
-          page: 1,
-          score: 10,
-          rank: 1,
-          subsection_analysis: [
-            {
-              paragraph: 1,
-              content: `Primary analysis for ${personaString} focusing on ${jobString}`,
-              key_points: ['Key insights extracted', 'Priority content identified'],
-              relevance_score: 9.5
-            }
-          ]
-        },
-        {
-          title: 'Key Findings',
-          content: `Main insights based on ${jobString}`,
-          page: 1,
-          score: 9,
-          rank: 2,
-          subsection_analysis: [
-            {
-              paragraph: 1,
-              content: 'Critical findings and recommendations',
-              key_points: ['Action items identified', 'Priority recommendations'],
-              relevance_score: 8.5
-            }
-          ]
-        },
-        {
-          title: 'Detailed Analysis',
-          content: 'In-depth content examination',
-          page: 2,
-          score: 8,
-          rank: 3,
-          subsection_analysis: [
-            {
-              paragraph: 1,
-              content: 'Comprehensive content breakdown',
-              key_points: ['Section analysis', 'Detailed insights'],
-              relevance_score: 8.0
-            }
-          ]
-        }
-      ];
-
-      return {
-        filename: file.originalname,
-        content: `Analysis completed for ${file.originalname}`,
-        sections: sections,
-        metadata: {
-          persona: personaString,
-          job_to_be_done: jobString,
-          total_sections: sections.length,
-          timestamp: new Date().toISOString(),
-          processing_time: 'completed',
-          document_count: files.length
-        }
-      };
+// Analysis jobs: uploads are queued and run one at a time by the worker
+// loop below; clients poll GET /api/jobs/:id or subscribe to its events
+const JOB_TTL_MS = 60 * 60 * 1000;
+const jobs = new Map();
+const jobQueue = [];
+let jobRunning = false;
+
+const jobSummary = (job, since = 0) => ({
+  jobId: job.id,
+  sessionId: job.sessionId,
+  status: job.status,
+  progress: {
+    completed: job.documents.filter((doc) => doc.status === 'completed' || doc.status === 'failed').length,
+    total: job.documents.length
+  },
+  documents: job.documents,
+  events: job.events.slice(since),
+  result: job.status === 'completed' ? job.result : undefined,
+  error: job.error
+});
+
+const addJobEvent = (job, event) => {
+  const entry = { seq: job.events.length + 1, time: new Date().toISOString(), ...event };
+  job.events.push(entry);
+  for (const listener of job.listeners) {
+    listener.write(`data: ${JSON.stringify(entry)}\n\n`);
+  }
+};
+
+const finishJob = (job, status, fields) => {
+  Object.assign(job, { status, ...fields });
+  addJobEvent(job, { type: 'status', status, ...(fields.error ? { error: fields.error } : {}) });
+  for (const listener of job.listeners) listener.end();
+  job.listeners.clear();
+  job.resolveDone();
+  // Forget finished jobs after a while so the map does not grow forever
+  setTimeout(() => jobs.delete(job.id), JOB_TTL_MS).unref();
+};
+
+const submitJob = (upload) => {
+  const job = {
+    id: uuidv4(),
+    sessionId: upload.sessionId,
+    status: 'queued',
+    upload,
+    documents: upload.files.map((file) => ({ filename: file.originalname, status: 'pending' })),
+    events: [],
+    listeners: new Set(),
+    result: null,
+    error: null
+  };
+  job.done = new Promise((resolve) => { job.resolveDone = resolve; });
+  jobs.set(job.id, job);
+  jobQueue.push(job);
+  addJobEvent(job, { type: 'status', status: 'queued' });
+  runNextJob();
+  return job;
+};
+
+const runNextJob = async () => {
+  if (jobRunning || jobQueue.length === 0) return;
+  jobRunning = true;
+  const job = jobQueue.shift();
+  job.status = 'running';
+  addJobEvent(job, { type: 'status', status: 'running' });
+
+  try {
+    const result = await runAnalysis(job.upload, (event) => {
+      const doc = job.documents.find((d) => d.filename === event.document);
+      if (doc) doc.status = event.status;
+      addJobEvent(job, { type: 'document', document: event.document, status: event.status });
     });
+    // Documents the engine sent no progress for: done if it wrote their output
+    const processed = new Set(result.results.map((output) => output.filename));
+    for (const doc of job.documents) {
+      if (doc.status !== 'failed') doc.status = processed.has(doc.filename) ? 'completed' : 'failed';
+    }
+    finishJob(job, 'completed', { result });
+  } catch (error) {
+    console.error('Analysis job failed:', error);
+    finishJob(job, 'failed', { error: error.message });
+  } finally {
+    jobRunning = false;
+    runNextJob();
+  }
+};
 
-    console.log('Analysis completed:', analysisResults.length, 'files processed');
+// Read an upload request into the fields runAnalysis needs
+const parseUpload = (req) => {
+  const files = req.files;
+  if (!files || files.length === 0) return null;
+  const sessionDir = path.dirname(files[0].path);
+  return {
+    files,
+    sessionDir,
+    sessionId: path.basename(sessionDir),
+    personaString: getPersonaString(req.body.persona),
+    jobString: getJobString(req.body.jobToBeDone)
+  };
+};
 
-    // Send response
+// API Routes
+app.get('/api/config', (req, res) => {
+  res.json({ adobeClientId: '1c2a84f90f1746778df9d4c1376896bd' });
+});
+
+// Submit an analysis job; returns its id immediately
+app.post('/api/jobs', upload.array('pdfs'), (req, res) => {
+  const uploadData = parseUpload(req);
+  if (!uploadData) {
+    return res.status(400).json({ error: 'No files uploaded' });
+  }
+  const job = submitJob(uploadData);
+  res.status(202).json(jobSummary(job));
+});
+
+// Poll a job; ?since=N returns only events after the Nth
+app.get('/api/jobs/:jobId', (req, res) => {
+  const job = jobs.get(req.params.jobId);
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+  res.json(jobSummary(job, parseInt(req.query.since, 10) || 0));
+});
+
+// Subscribe to a job's events as Server-Sent Events
+app.get('/api/jobs/:jobId/events', (req, res) => {
+  const job = jobs.get(req.params.jobId);
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+  res.set({ 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', Connection: 'keep-alive' });
+  res.flushHeaders();
+  for (const event of job.events) {
+    res.write(`data: ${JSON.stringify(event)}\n\n`);
+  }
+  if (job.status === 'completed' || job.status === 'failed') {
+    return res.end();
+  }
+  job.listeners.add(res);
+  req.on('close', () => job.listeners.delete(res));
+});
+
+// Directory of an upload session, or null for an id that is not a session id
+const sessionDirFor = (sessionId) => (
+  /^[0-9a-f-]{36}$/.test(sessionId) ? path.join(__dirname, 'sessions', sessionId) : null
+);
+
+// Re-rank an analysed session for a new persona/job. Only ranking and
+// subsection analysis run again, on the extractions stored by the first
+// analysis, so this answers in milliseconds instead of re-reading the PDFs
+app.post('/api/sessions/:sessionId/rerank', async (req, res) => {
+  const sessionDir = sessionDirFor(req.params.sessionId);
+  if (!sessionDir || !(await fs.pathExists(path.join(sessionDir, 'output')))) {
+    return res.status(404).json({ error: 'No analysed session with this id' });
+  }
+  const personaString = getPersonaString(req.body.persona);
+  const jobString = getJobString(req.body.jobToBeDone);
+  try {
+    const outputs = await analyzeSession(sessionDir, personaString, jobString, null, 'rerank');
+    const timestamp = new Date().toISOString();
     res.json({
-      sessionId,
-      results: analysisResults,
+      sessionId: req.params.sessionId,
+      results: outputs.map((output) => ({
+        ...output,
+        metadata: { ...output.metadata, timestamp, document_count: outputs.length }
+      })),
       metadata: {
-        timestamp: new Date().toISOString(),
-        total_documents: files.length,
+        timestamp,
+        total_documents: outputs.length,
         persona: personaString,
         job_to_be_done: jobString
       },
       success: true
     });
+  } catch (error) {
+    console.error('Re-rank error:', error);
+    res.status(500).json({ error: 'Re-rank failed', details: error.message });
+  }
+});
+
+// Ranked sections of one analysed document: ?top=K for the best K, or
+// ?page=N&pageSize=M (default 1 and 10) for the Nth page in rank order
+app.get('/api/sessions/:sessionId/results/:filename/sections', async (req, res) => {
+  const { sessionId, filename } = req.params;
+  const sessionDir = sessionDirFor(sessionId);
+  if (!sessionDir || path.basename(filename) !== filename) {
+    return res.status(400).json({ error: 'Invalid session or file name' });
+  }
+  const outputFile = path.join(sessionDir, 'output', `${path.parse(filename).name}.json`);
+  if (!(await fs.pathExists(outputFile))) {
+    return res.status(404).json({ error: 'Result not found' });
+  }
+
+  const top = parseInt(req.query.top, 10);
+  const page = Math.max(1, parseInt(req.query.page, 10) || 1);
+  const pageSize = Math.max(1, parseInt(req.query.pageSize, 10) || RESULT_SECTIONS);
+  const [start, count] = top > 0 ? [0, top] : [(page - 1) * pageSize, pageSize];
+  try {
+    const { filename: name, sections, sections_total: total } = await readResult(outputFile, start, count,
+      ['content', 'tables', 'images', 'metadata']);
+    res.json({ filename: name, total, ...(top > 0 ? { top } : { page, pageSize }), sections });
+  } catch (error) {
+    console.error('Result read error:', error);
+    res.status(500).json({ error: 'Could not read result', details: error.message });
+  }
+});
+
+// Analysis endpoint (synchronous; runs through the same job queue)
+app.post('/api/analyze', upload.array('pdfs'), async (req, res) => {
+  try {
+    const uploadData = parseUpload(req);
+    if (!uploadData) {
+      return res.status(400).json({ error: 'No files uploaded' });
+    }
+
+    const job = submitJob(uploadData);
+    await job.done;
+    if (job.status !== 'completed') {
+      throw new Error(job.error || 'Analysis failed');
+    }
+
+    // Send response
+    res.json(job.result);
 
   } catch (error) {
     console.error('Analysis error:', error);
@@ -161,4 +462,5 @@ app.post('/api/analyze', upload.array('pdfs'), async (req, res) => {
 // Start server
 app.listen(port, () => {
   console.log(`Server running on port ${port}`);
-}); 
\ No newline at end of file
+  startDaemon();
+});
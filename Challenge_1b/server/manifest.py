@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import json
+import os
+from pathlib import Path
+from extraction_cache import file_sha256
+from output_writer import INDEX_SUFFIX, index_path, read_output
+from page_store import pages_path
+from result_index import load_index
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Keys ranking and subsection analysis add to a section
+RANKING_KEYS = ("score", "rank", "subsection_analysis", "paragraph_scores")
+
+
+class Manifest:
+    """Record of the inputs an output directory was built from.
+
+    For every processed PDF it keeps the size, mtime and SHA-256 of the
+    input plus the output and image files written for it (with each
+    output's size and mtime), and for the directory as a whole the settings
+    they were produced with. On a re-run plan() sorts the session's PDFs
+    into changed (new or modified) and unchanged ones, and the inputs that
+    are gone; unchanged files are recognised by size and mtime, and only
+    hashed when those differ. An input whose outputs are missing or were
+    rewritten since (e.g. by another engine) counts as changed.
+    Different settings make every input count as changed. The persona
+    and job the outputs were last ranked for are kept apart, in query, as
+    a new query only means re-ranking (see rerank.py).
+    """
+
+    def __init__(self, output_dir, settings):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self.settings = settings
+        self.entries = {}
+        self.stale = {}  # entries written with other settings
+        self.query = None  # [persona, job_to_be_done]
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION and data.get("settings") == settings:
+                self.entries = data["inputs"]
+                self.query = data.get("query")
+            else:
+                self.stale = data.get("inputs", {})
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def plan(self, pdf_files):
+        """Split pdf_files into (changed, unchanged) and list removed input names"""
+        changed = []
+        unchanged = []
+        for pdf_file in pdf_files:
+            entry = self.entries.get(pdf_file.name)
+            if entry is None or not self._outputs_intact(entry):
+                changed.append(pdf_file)
+                continue
+            stat = pdf_file.stat()
+            if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+                unchanged.append(pdf_file)
+            elif stat.st_size == entry["size"] and file_sha256(pdf_file) == entry["sha256"]:
+                # Touched but identical: keep it, remember the new mtime
+                entry["mtime_ns"] = stat.st_mtime_ns
+                unchanged.append(pdf_file)
+            else:
+                changed.append(pdf_file)
+        names = {pdf_file.name for pdf_file in pdf_files}
+        removed = sorted((set(self.entries) | set(self.stale)) - names)
+        return changed, unchanged, removed
+
+    def _outputs_intact(self, entry):
+        """Whether every recorded output is still the file this manifest noted"""
+        output_stats = entry.get("output_stats")
+        if not output_stats:
+            return False
+        for relative, (size, mtime_ns) in output_stats.items():
+            try:
+                stat = (self.output_dir / relative).stat()
+            except OSError:
+                return False
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                return False
+        return True
+
+    def record(self, pdf_file, outputs, images=()):
+        """Note that pdf_file was processed into outputs (paths in output_dir)
+
+        Files an earlier run wrote for the same input and this one did not
+        (e.g. after the output format changed) are deleted.
+        """
+        # Sidecar indexes the writer put next to the outputs go with them;
+        # one left by an earlier run for another output is not recorded
+        outputs = [*outputs, *(index_path(path) for path in outputs if load_index(path) is not None)]
+        stat = pdf_file.stat()
+        old = self.stale.pop(pdf_file.name, None) or self.entries.get(pdf_file.name)
+        if old and (old["size"], old["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            sha256 = old["sha256"]
+        else:
+            sha256 = file_sha256(pdf_file)
+        output_stats = {}
+        for path in outputs:
+            output_stat = Path(path).stat()
+            output_stats[str(Path(path).relative_to(self.output_dir))] = [output_stat.st_size,
+                                                                          output_stat.st_mtime_ns]
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "outputs": sorted(output_stats),
+            "output_stats": output_stats,
+            "images": sorted({image["image_file"] for image in images})
+        }
+        self.entries[pdf_file.name] = entry
+        if old:
+            self._delete(old, keep=entry["outputs"])
+
+    def forget(self, name):
+        """Drop an input from the manifest, deleting its outputs and any image
+        files no other input refers to"""
+        entry = self.entries.pop(name, None) or self.stale.pop(name, None)
+        if entry:
+            self._delete(entry)
+
+    def _delete(self, entry, keep=()):
+        still_used = set(keep)
+        for other in list(self.entries.values()) + list(self.stale.values()):
+            still_used.update(other.get("images", []))
+        for relative in entry.get("outputs", []) + entry.get("images", []):
+            if relative in still_used:
+                continue
+            try:
+                os.remove(self.output_dir / relative)
+            except FileNotFoundError:
+                pass
+
+    def output_file(self, name):
+        """Main output file recorded for an input (not its page store or index)"""
+        for relative in self.entries[name]["outputs"]:
+            if not relative.endswith((".pages.json", INDEX_SUFFIX)):
+                return self.output_dir / relative
+        raise KeyError(name)
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "settings": self.settings, "query": self.query,
+                "inputs": self.entries}
+        tmp_path = self.path.with_name(f"{MANIFEST_NAME}.tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def read_settings(output_dir):
+    """Settings recorded in output_dir's manifest, or None if it has none"""
+    try:
+        with open(Path(output_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data.get("settings") if data.get("version") == MANIFEST_VERSION else None
+
+
+def load_output_extraction(manifest, pdf_file):
+    """Rebuild a document's extraction from the outputs of an earlier run
+
+    Sections go back to document order and lose their scores, ranks and
+    subsection analysis so they can be ranked again; pages come from the
+    page store if there is one. Engines without a page store (fast) get
+    the pages_read their earlier output reported.
+    Raises OSError/ValueError/KeyError if the outputs are missing or broken.
+    """
+    data = read_output(manifest.output_file(pdf_file.name))
+    # Back in document order, which ranking ties are broken by
+    ranked = sorted(data["sections"], key=lambda section: (section.get("page", 0), section.get("start_offset", 0)))
+    sections = [{key: value for key, value in section.items() if key not in RANKING_KEYS}
+                for section in ranked]
+    pages = []
+    store_file = pages_path(manifest.output_dir, pdf_file.stem)
+    if store_file.exists():
+        with open(store_file, "r", encoding="utf-8") as f:
+            pages = json.load(f)["pages"]
+    pages_read = data.get("metadata", {}).get("pages_read", len(pages))
+    return {"pages": pages, "pages_read": pages_read, "content": data.get("content", ""), "sections": sections,
+            "tables": data.get("tables", []), "images": data.get("images", [])}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import gc
+import os
+import resource
+import sys
+
+DEFAULT_BATCH_PAGES = 50
+
+
+def env_max_memory_mb():
+    """RSS ceiling from PDF_MAX_MEMORY_MB (None = memory-bounded mode off)"""
+    value = os.environ.get("PDF_MAX_MEMORY_MB")
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _load_libc():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"))
+    except OSError:
+        return None
+
+
+_libc = _load_libc()
+
+
+def trim_heap():
+    """Hand freed heap pages back to the OS (glibc only; a no-op elsewhere)"""
+    if _libc is not None and hasattr(_libc, "malloc_trim"):
+        _libc.malloc_trim(0)
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # No /proc (e.g. macOS): the peak is the best available figure
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024)
+
+
+class MemoryBudget:
+    """Page batch size and RSS ceiling for memory-bounded processing.
+
+    After every batch the caller releases its page caches and calls
+    check(). If RSS is still above the ceiling, the batch size is halved,
+    so fewer pages are held at once; it never drops below one page.
+    """
+
+    def __init__(self, max_memory_mb, batch_pages=None):
+        self.max_memory_mb = max_memory_mb
+        self.batch_pages = batch_pages or DEFAULT_BATCH_PAGES
+        self.peak_mb = 0.0
+        self.batches = 0
+        self.over_ceiling = 0
+
+    def check(self):
+        """Record RSS after a batch; returns True if it is over the ceiling"""
+        gc.collect()
+        trim_heap()
+        rss = current_rss_mb()
+        self.peak_mb = max(self.peak_mb, rss)
+        self.batches += 1
+        if rss <= self.max_memory_mb:
+            return False
+        self.over_ceiling += 1
+        self.batch_pages = max(1, self.batch_pages // 2)
+        return True
+
+    def report(self):
+        return {
+            "max_memory_mb": self.max_memory_mb,
+            "peak_rss_mb": round(max(self.peak_mb, peak_rss_mb()), 1),
+            "batch_rss_peak_mb": round(self.peak_mb, 1),
+            "batches": self.batches,
+            "batches_over_ceiling": self.over_ceiling,
+            "final_batch_pages": self.batch_pages
+        }
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Verbosity levels: errors only, per-file progress, per-stage and per-page detail
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+
+_verbosity = int(os.environ.get("PDF_VERBOSITY", NORMAL))
+
+
+def set_verbosity(level):
+    global _verbosity
+    _verbosity = level
+
+
+def get_verbosity():
+    return _verbosity
+
+
+def log(message, level=NORMAL):
+    """Print message if the current verbosity includes level"""
+    if level <= _verbosity:
+        print(message)
+
+
+class StageTimer:
+    """Wall-clock time per named stage of processing one document.
+
+    Entering the same stage more than once adds to its total.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def update(self, timings):
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def rounded(self, digits=4):
+        return {name: round(seconds, digits) for name, seconds in self.timings.items()}
+
+
+def write_metrics(path, documents, collection=None):
+    """Write per-document stage timings (and collection-wide ones) as JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"documents": documents, "collection": collection or {}}, f, indent=2)
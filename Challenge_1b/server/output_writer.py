@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+import gzip
+import json
+import os
+from pathlib import Path
+
+# orjson is optional; it serializes several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ("json", "json-indent", "ndjson")
+DEFAULT_FORMAT = "json"
+
+# Sidecar index of byte ranges written next to uncompressed json/ndjson outputs
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+
+def env_output_format():
+    """Output format from PDF_OUTPUT_FORMAT (json, json-indent or ndjson)"""
+    return os.environ.get("PDF_OUTPUT_FORMAT") or DEFAULT_FORMAT
+
+
+def env_output_gzip():
+    """PDF_OUTPUT_GZIP=1 gzips every output file"""
+    return os.environ.get("PDF_OUTPUT_GZIP", "0") == "1"
+
+
+def dumps(obj, indent=False):
+    """Serialize obj to UTF-8 JSON bytes, compact unless indent is set"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class OutputWriter:
+    """Writes one document's output dict in the configured format.
+
+    json         compact JSON (default)
+    json-indent  indented JSON, for reading by eye while debugging
+    ndjson       a "document" record (everything but the sections), then
+                 one "section" record per section, so readers can start on
+                 the top sections without parsing the whole file
+
+    With compress set the file is gzipped and gets a .gz suffix.
+
+    Uncompressed json and ndjson outputs get a sidecar <stem>.idx.json with
+    the byte range of every section (in file and in rank order) and of the
+    document-level fields, so result_index.ResultReader can seek straight
+    to the parts it needs.
+    """
+
+    def __init__(self, format=None, compress=None):
+        self.format = format or env_output_format()
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown output format: {self.format} (expected one of {', '.join(FORMATS)})")
+        self.compress = env_output_gzip() if compress is None else compress
+
+    @property
+    def suffix(self):
+        suffix = ".ndjson" if self.format == "ndjson" else ".json"
+        return suffix + ".gz" if self.compress else suffix
+
+    def path_for(self, output_dir, stem):
+        return Path(output_dir) / f"{stem}{self.suffix}"
+
+    def _open(self, path):
+        if self.compress:
+            # Fast compression level; output is written far more often than it is archived
+            return gzip.open(path, "wb", compresslevel=5)
+        return open(path, "wb")
+
+    def write(self, output_dir, stem, data, index=True):
+        """Write data as output_dir/<stem><suffix> and return the path
+
+        index=False skips the sidecar index, for outputs that are always
+        read whole.
+        """
+        output_file = self.path_for(output_dir, stem)
+        with self._open(output_file) as f:
+            ranges = self._write_body(f, data)
+        sidecar = index_path(output_file)
+        if index and ranges is not None and not self.compress:
+            write_index(output_file, ranges, data.get("sections", []))
+        elif sidecar.exists():
+            # Left over from an earlier run in an indexed format
+            os.remove(sidecar)
+        return output_file
+
+    def _write_body(self, f, data):
+        """Write data to f; returns the byte ranges an index needs, or None"""
+        if self.format == "json-indent":
+            f.write(dumps(data, indent=True))
+            return None
+        position = 0
+
+        def put(chunk):
+            nonlocal position
+            f.write(chunk)
+            position += len(chunk)
+            return [position - len(chunk), position]
+
+        ranges = {"sections": []}
+        if self.format == "ndjson":
+            sections = data.get("sections", [])
+            document = {key: value for key, value in data.items() if key != "sections"}
+            ranges["document"] = put(dumps({"type": "document", **document}) + b"\n")
+            for index, section in enumerate(sections):
+                ranges["sections"].append(put(dumps({"type": "section", "index": index, **section}) + b"\n"))
+            return ranges
+
+        # Compact JSON written member by member; the bytes are the same as dumps(data)
+        ranges["fields"] = {}
+        put(b"{")
+        for n, (key, value) in enumerate(data.items()):
+            put((b"," if n else b"") + dumps(key) + b":")
+            if key == "sections":
+                put(b"[")
+                for i, section in enumerate(value):
+                    if i:
+                        put(b",")
+                    ranges["sections"].append(put(dumps(section)))
+                put(b"]")
+            else:
+                ranges["fields"][key] = put(dumps(value))
+        put(b"}")
+        return ranges
+
+
+def index_path(output_file):
+    """Sidecar index of an output file: <stem>.idx.json next to it"""
+    output_file = Path(output_file)
+    name = output_file.name
+    for suffix in (".gz", ".ndjson", ".json"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return output_file.with_name(name + INDEX_SUFFIX)
+
+
+def write_index(output_file, ranges, sections):
+    """Write the sidecar index for output_file from the ranges _write_body returned
+
+    "ranks" lists section positions in rank order (file order when the
+    sections carry no rank). The output's size and mtime are recorded so a
+    reader can tell when the index no longer matches the file.
+    """
+    ranks = list(range(len(sections)))
+    if all(isinstance(section.get("rank"), int) for section in sections):
+        ranks.sort(key=lambda i: sections[i]["rank"])
+    stat = os.stat(output_file)
+    index = {"version": INDEX_VERSION, "output": Path(output_file).name, "size": stat.st_size,
+             "mtime_ns": stat.st_mtime_ns, **ranges, "ranks": ranks}
+    with open(index_path(output_file), "wb") as f:
+        f.write(dumps(index))
+
+
+def read_output(path):
+    """Load an output file written by OutputWriter, whatever its format"""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        if ".ndjson" not in path.suffixes:
+            return loads(f.read())
+        data = None
+        sections = []
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            record_type = record.pop("type", None)
+            if record_type == "document":
+                data = record
+            elif record_type == "section":
+                record.pop("index", None)
+                sections.append(record)
+    data = data or {}
+    data["sections"] = sections
+    return data
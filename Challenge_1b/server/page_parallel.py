@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import os
+
+# Below this many pages per worker, process start-up costs more than it saves
+MIN_PAGES_PER_WORKER = 8
+
+
+def env_page_workers():
+    """Page worker count from PDF_PAGE_WORKERS (None = page-parallel mode off)"""
+    value = os.environ.get("PDF_PAGE_WORKERS")
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def count_pages(pdf_path, backend="fitz"):
+    if backend == "pypdf2":
+        from PyPDF2 import PdfReader
+        return len(PdfReader(pdf_path).pages)
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def read_page_range(pdf_path, start, end, backend="fitz", layout=False):
+    """Text of pages [start, end); an unreadable page comes back as an empty string
+
+    With layout (fitz only) each page is a (text, heading offsets) pair
+    from headings.page_layout instead.
+    """
+    texts = []
+    if backend == "pypdf2":
+        from PyPDF2 import PdfReader
+        reader = PdfReader(pdf_path)
+        for page in reader.pages[start:end]:
+            try:
+                texts.append(page.extract_text() or "")
+            except Exception:
+                texts.append("")
+    else:
+        import fitz  # PyMuPDF
+        from headings import page_layout
+        with fitz.open(pdf_path) as doc:
+            for page_index in range(start, end):
+                try:
+                    if layout:
+                        texts.append(page_layout(doc[page_index]))
+                    else:
+                        texts.append(doc[page_index].get_text() or "")
+                except Exception:
+                    texts.append(("", None) if layout else "")
+    return texts
+
+
+def split_page_ranges(page_count, workers):
+    """Split [0, page_count) into `workers` contiguous, near-equal ranges"""
+    base, extra = divmod(page_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        end = start + base + (1 if i < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_pages_parallel(pdf_path, workers=None, backend="fitz", max_pages=None, layout=False):
+    """Read every page of a PDF, spreading page ranges across worker processes.
+
+    Each worker opens its own copy of the document and reads one contiguous
+    range; the per-page texts are merged back in page order. Small documents
+    are read in-process since they would not amortise the pool start-up.
+    layout returns (text, heading offsets) pairs, as read_page_range does.
+    """
+    pdf_path = str(pdf_path)
+    page_count = count_pages(pdf_path, backend)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, page_count // MIN_PAGES_PER_WORKER))
+    if workers == 1:
+        return read_page_range(pdf_path, 0, page_count, backend, layout)
+
+    from concurrent.futures import ProcessPoolExecutor
+    pages = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_page_range, pdf_path, start, end, backend, layout)
+                   for start, end in split_page_ranges(page_count, workers)]
+        for future in futures:
+            pages.extend(future.result())
+    return pages
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import json
+from pathlib import Path
+
+
+class PageStore:
+    """Per-page text of one document, with pages fetched from the PDF on demand.
+
+    Sections record (page, start_offset) and (end_page, end_offset) into this
+    store, so a reader can pull the text of one section, or one page,
+    without re-extracting the whole document. Pages that were not saved are
+    read lazily from pdf_path with the same backend that produced the
+    offsets.
+    """
+
+    def __init__(self, pages=None, pdf_path=None, backend="fitz"):
+        self._pages = dict(enumerate(pages or [], 1))
+        self.pdf_path = str(pdf_path) if pdf_path else None
+        self.backend = backend
+        self._source = None
+
+    @classmethod
+    def load(cls, path, pdf_path=None):
+        """Open a store saved with save(); missing pages come from pdf_path"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["pages"], pdf_path, data.get("backend", "fitz"))
+
+    def save(self, path, filename=None):
+        pages = [self._pages[n] for n in sorted(self._pages)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"filename": filename, "backend": self.backend, "pages": pages},
+                      f, ensure_ascii=False)
+
+    def _fetch(self, page_number):
+        if self.pdf_path is None:
+            raise KeyError(f"Page {page_number} is not stored and no PDF was given")
+        if self._source is None:
+            if self.backend == "pypdf2":
+                from PyPDF2 import PdfReader
+                self._source = PdfReader(self.pdf_path)
+            else:
+                import fitz  # PyMuPDF
+                self._source = fitz.open(self.pdf_path)
+        if self.backend == "pypdf2":
+            return self._source.pages[page_number - 1].extract_text() or ""
+        return self._source[page_number - 1].get_text() or ""
+
+    def page(self, page_number):
+        """Text of one page (1-based), fetched from the PDF the first time"""
+        if page_number not in self._pages:
+            self._pages[page_number] = self._fetch(page_number)
+        return self._pages[page_number]
+
+    def text(self, start_page, start_offset, end_page, end_offset):
+        """Raw text between two (page, offset) positions; pages joined by newlines"""
+        if start_page == end_page:
+            return self.page(start_page)[start_offset:end_offset]
+        parts = [self.page(start_page)[start_offset:]]
+        parts.extend(self.page(n) for n in range(start_page + 1, end_page))
+        parts.append(self.page(end_page)[:end_offset])
+        return "\n".join(parts)
+
+    def section_text(self, section):
+        """Raw text a section spans, read only from the pages it covers"""
+        return self.text(section['page'], section['start_offset'],
+                         section['end_page'], section['end_offset'])
+
+    def close(self):
+        if self._source is not None and self.backend != "pypdf2":
+            self._source.close()
+        self._source = None
+
+
+def pages_path(output_dir, pdf_stem):
+    return Path(output_dir) / f"{pdf_stem}.pages.json"
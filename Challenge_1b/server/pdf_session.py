@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+from headings import page_layout
+
+
+class PdfSession:
+    """Open a PDF once and serve text, tables and images from the same parse
+
+    PyMuPDF and the table and image helpers are imported on first use, so
+    importing this module is cheap for runs that never open a PDF.
+    """
+
+    def __init__(self, pdf_path):
+        import fitz  # PyMuPDF
+        self.path = str(pdf_path)
+        self.doc = fitz.open(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+    @property
+    def page_count(self):
+        return self.doc.page_count
+
+    def page_text(self, page_index):
+        """Text of a single page (0-based index)"""
+        return self.doc[page_index].get_text() or ""
+
+    def page_layout(self, page_index):
+        """Text of a single page plus its font-detected heading offsets"""
+        return page_layout(self.doc[page_index])
+
+    def release_page_cache(self, reopen=False):
+        """Free MuPDF's cached fonts, images and page data.
+
+        reopen also closes and reopens the document, dropping everything
+        parsed so far.
+        """
+        import fitz  # PyMuPDF
+        fitz.TOOLS.store_shrink(100)
+        if reopen:
+            self.doc.close()
+            self.doc = fitz.open(self.path)
+
+    def extract_tables(self, full_scan=False, pages=None):
+        """Tables from every page, same shape as pdfplumber's extract_tables()
+
+        Pages without enough ruling lines to form a table cell are skipped
+        unless full_scan is set. pages limits the scan to a range of indexes.
+        """
+        from table_filter import page_may_have_tables
+        tables = []
+        for page_num in (pages if pages is not None else range(self.page_count)):
+            page = self.doc[page_num]
+            if not full_scan and not page_may_have_tables(page):
+                continue
+            for table in page.find_tables().tables:
+                tables.append({"page": page_num + 1, "data": table.extract()})
+        return tables
+
+    def extract_images(self, output_dir, pages=None, stored=None):
+        """Store every embedded image in output_dir/images, named by content hash"""
+        from image_store import extract_document_images
+        return extract_document_images(self.doc, output_dir / "images", pages, stored)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from pathlib import Path
+from extraction_cache import ExtractionCache
+from page_parallel import count_pages
+from bm25 import section_text
+from query import compile_query
+from scoring import SCORINGS, new_index, resolve_scoring
+from output_writer import FORMATS, OutputWriter
+from scheduler import Scheduler, SKIPPED, env_time_budget, estimate_cost, DEPTHS
+from metrics import QUIET, NORMAL, VERBOSE, StageTimer, log, set_verbosity, write_metrics
+from process_pdfs_webapp import (PERSONA_KEYWORDS, document_metrics_record, find_input_dir,
+                                 load_or_extract, rank_sections, read_session_input, write_pdf_output)
+
+
+def describe_document(pdf_file):
+    """Page count and size the scheduler's cost model works from"""
+    try:
+        pages = count_pages(str(pdf_file))
+    except Exception as e:
+        log(f"Error reading {pdf_file.name}: {e}", QUIET)
+        pages = 0
+    return {"pages": pages, "size": pdf_file.stat().st_size}
+
+
+def process_pdfs_adaptive(session_dir, time_budget=None, use_cache=True, verbosity=None, metrics_file=None,
+                          on_progress=None, output_format=None, gzip_output=None, scoring=None):
+    """Process a session's PDFs within a time budget for the whole job
+
+    Instead of fixed page caps per engine, every document gets the best
+    extraction depth (scheduler.DEPTHS) the remaining time allows: all
+    pages with tables and images when there is room, down to a three-page
+    outline, or an empty output if not even that fits. Sections are ranked
+    across the collection as in process_pdfs_webapp, and each output
+    records the depth it got in metadata["depth"].
+    time_budget is in seconds (default: PDF_TIME_BUDGET or 10). Documents
+    are processed one at a time so each can be planned with what is left.
+    """
+    started = time.perf_counter()
+    if verbosity is not None:
+        set_verbosity(verbosity)
+    if time_budget is None:
+        time_budget = env_time_budget()
+    session_path = Path(session_dir)
+    input_dir = find_input_dir(session_path)
+    if not input_dir:
+        log(f"No PDF files found in session directory: {session_dir}", QUIET)
+        return
+
+    output_dir = session_path / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    persona, job_to_be_done = read_session_input(session_path)
+    query = compile_query(persona, job_to_be_done, PERSONA_KEYWORDS)
+    scoring = resolve_scoring(scoring)
+    writer = OutputWriter(output_format, gzip_output)
+    cache = ExtractionCache(enabled=None if use_cache else False)
+
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    total_files = len(pdf_files)
+    docs = [describe_document(pdf_file) for pdf_file in pdf_files]
+    log(f"Processing {total_files} files within {time_budget}s "
+        f"(full-depth estimate {sum(estimate_cost(doc, DEPTHS[0]) for doc in docs):.1f}s)")
+    # The budget covers the whole job, including the time already spent
+    scheduler = Scheduler(docs, time_budget - (time.perf_counter() - started), time.perf_counter)
+
+    extracted = []
+    for i, pdf_file in enumerate(pdf_files):
+        depth = scheduler.next_depth(i)
+        pages = "all" if depth["max_pages"] is None else depth["max_pages"]
+        log(f"Processing: {pdf_file.name} ({depth['name']}, pages: {pages}, {scheduler.remaining():.2f}s left)")
+        if depth is SKIPPED:
+            extraction = {"pages": [], "sections": [], "tables": [], "images": [], "timings": {}}
+        else:
+            doc_started = time.perf_counter()
+            extraction = load_or_extract(pdf_file, output_dir, cache, depth=depth)
+            # A cache hit (no "open" stage) says nothing about how fast extraction is
+            if "open" in extraction["timings"]:
+                scheduler.record(i, depth, time.perf_counter() - doc_started)
+            if extraction.pop("truncated", False):
+                log(f"  Stopped early at the deadline: {pdf_file.name}")
+            if "error" in extraction:
+                log(f"Error processing {pdf_file.name}: {extraction['error']}", QUIET)
+                if on_progress:
+                    on_progress({"document": pdf_file.name, "status": "failed", "total": total_files})
+                continue
+        extracted.append((pdf_file, extraction, depth))
+        if on_progress:
+            on_progress({"document": pdf_file.name, "status": "extracted", "total": total_files})
+    log(f"Cost model calibration: {scheduler.calibration:.2f}x", VERBOSE)
+
+    collection_timer = StageTimer()
+    with collection_timer.stage("index"):
+        index = new_index(scoring)
+        section_ids = []
+        for pdf_file, extraction, depth in extracted:
+            section_ids.append([index.add(section_text(section)) for section in extraction["sections"]])
+        scores = index.score(query.terms)
+
+    processed_files = []
+    document_metrics = []
+    for (pdf_file, extraction, depth), ids in zip(extracted, section_ids):
+        timer = StageTimer()
+        timer.update(extraction.pop("timings", {}))
+        with timer.stage("ranking"):
+            ranked_sections = rank_sections(extraction["sections"], query, [scores[i] for i in ids])
+        output_file = write_pdf_output(pdf_file, output_dir, extraction, ranked_sections, query, timer, writer,
+                                       subsections=depth["subsections"],
+                                       metadata={"depth": depth["name"]})
+        processed_files.append(pdf_file.name)
+        document_metrics.append({**document_metrics_record(pdf_file, timer), "depth": depth["name"]})
+        if on_progress:
+            on_progress({"document": pdf_file.name, "status": "completed", "total": total_files})
+        log(f"Completed: {pdf_file.name} -> {output_file}")
+
+    if metrics_file:
+        write_metrics(metrics_file, document_metrics, collection_timer.rounded())
+    elapsed = time.perf_counter() - started
+    log(f"Processing complete. {len(processed_files)} files processed in {elapsed:.2f}s "
+        f"(budget {time_budget}s).")
+    return processed_files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process PDFs within a time budget")
+    parser.add_argument("session_dir", help="Session directory containing the PDFs")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Seconds for the whole job (default: PDF_TIME_BUDGET or 10)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-extract instead of using the extraction cache")
+    parser.add_argument("--verbosity", type=int, choices=[QUIET, NORMAL, VERBOSE], default=None,
+                        help="0 = errors only, 1 = per-file progress, 2 = per-stage and per-page "
+                             "(default: PDF_VERBOSITY or 1)")
+    parser.add_argument("--metrics", help="Write per-document stage timings and depths to this JSON file")
+    parser.add_argument("--scoring", choices=SCORINGS, default=None,
+                        help="Section scoring (default: PDF_SCORING or bm25)")
+    parser.add_argument("--output-format", choices=FORMATS, default=None,
+                        help="json (compact), json-indent (for debugging) or ndjson "
+                             "(default: PDF_OUTPUT_FORMAT or json)")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="Gzip output files (default: PDF_OUTPUT_GZIP)")
+    args = parser.parse_args()
+
+    process_pdfs_adaptive(args.session_dir, time_budget=args.budget, use_cache=not args.no_cache,
+                          verbosity=args.verbosity, metrics_file=args.metrics,
+                          output_format=args.output_format, gzip_output=args.gzip, scoring=args.scoring)
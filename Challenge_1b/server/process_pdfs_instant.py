@@ -3,6 +3,7 @@ import sys
 import json
 import os
 from pathlib import Path
+from output_writer import OutputWriter
 
 def create_instant_result(pdf_name, persona, job):
     """Create an instant result without any processing"""
@@ -88,6 +89,7 @@ def process_pdfs_instant(session_dir):
     # Create output directory
     output_dir = session_path / "output"
     output_dir.mkdir(parents=True, exist_ok=True)
+    writer = OutputWriter()  # PDF_OUTPUT_FORMAT / PDF_OUTPUT_GZIP
 
     print(f"Processing from: {input_dir}")
 
@@ -132,9 +134,7 @@ def process_pdfs_instant(session_dir):
             result = create_instant_result(pdf_file.name, persona, job_to_be_done)
 
             # Save to output
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, result)
 
             results.append(result)
             print(f"Completed: {pdf_file.name}")
@@ -145,9 +145,7 @@ def process_pdfs_instant(session_dir):
             fallback_result = create_instant_result(pdf_file.name, persona, job_to_be_done)
 
             # Save fallback result
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(fallback_result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, fallback_result)
 
             results.append(fallback_result)
             print(f"Created fallback result for: {pdf_file.name}")
@@ -4,34 +4,51 @@ import json
 import os
 from pathlib import Path
 from PyPDF2 import PdfReader
+from extraction_cache import ExtractionCache
+from page_parallel import env_page_workers, extract_pages_parallel
+from streaming import iter_page_lines
+from output_writer import OutputWriter
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF safely"""
+def extract_pages_from_pdf(pdf_path, page_workers=None):
+    """Extract per-page text from PDF safely (None if it can't be read)"""
     try:
+        if page_workers is not None:
+            # Page-parallel mode: read every page across worker processes
+            return extract_pages_parallel(pdf_path, page_workers, backend="pypdf2")
         reader = PdfReader(pdf_path)
-        text = ""
+        pages = []
         for i, page in enumerate(reader.pages[:5]):  # Only first 5 pages
             try:
-                page_text = page.extract_text() or ""
-                text += page_text + "\n"
-            except:
-                continue
-        return text
+                pages.append(page.extract_text() or "")
+            except Exception:
+                # Keep the page so later pages keep their numbers
+                pages.append("")
+        return pages
     except Exception as e:
         print(f"Error reading PDF: {e}")
-        return ""
+        return None
+
+def extract_text_from_pdf(pdf_path, page_workers=None):
+    """Extract text from PDF safely"""
+    pages = extract_pages_from_pdf(pdf_path, page_workers) or []
+    return "".join(page_text + "\n" for page_text in pages)
+
+def new_section(title, page, offset):
+    return {"title": title, "content": "", "page": page, "start_offset": offset,
+            "end_page": page, "end_offset": offset}
+
+def extract_sections_simple(pages):
+    """Simple section extraction
 
-def extract_sections_simple(text):
-    """Simple section extraction"""
+    pages is a list of page texts (a plain string counts as one page); each
+    section records the pages and character offsets it spans.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
     sections = []
-    lines = text.split('\n')
-    current_section = {"title": "Introduction", "content": "", "page": 1}
+    current_section = new_section("Introduction", 1, 0)
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
+    for page_number, start, end, line in iter_page_lines(enumerate(pages, 1)):
         # Simple heading detection
         if (len(line) < 100 and 
             (line.isupper() or 
@@ -41,9 +58,11 @@ def extract_sections_simple(text):
             
             if current_section["content"].strip():
                 sections.append(current_section)
-            current_section = {"title": line, "content": "", "page": 1}
+            current_section = new_section(line, page_number, start)
         else:
             current_section["content"] += line + "\n"
+        current_section["end_page"] = page_number
+        current_section["end_offset"] = end
     
     if current_section["content"].strip():
         sections.append(current_section)
@@ -140,6 +159,7 @@ def process_pdfs_simple(session_dir):
     # Create output directory
     output_dir = session_path / "output"
     output_dir.mkdir(parents=True, exist_ok=True)
+    writer = OutputWriter()  # PDF_OUTPUT_FORMAT / PDF_OUTPUT_GZIP
     
     print(f"Processing from: {input_dir}")
     
@@ -168,18 +188,34 @@ def process_pdfs_simple(session_dir):
     print(f"Job: {job_to_be_done}")
     
     results = []
+    cache = ExtractionCache()
+    
+    # PDF_PAGE_WORKERS lifts the 5-page cap and reads pages in parallel
+    page_workers = env_page_workers()
+    max_pages = None if page_workers is not None else 5
     
     # Process each PDF
     for pdf_file in input_dir.glob("*.pdf"):
         print(f"Processing: {pdf_file.name}")
         
         try:
-            # Extract text
-            text = extract_text_from_pdf(str(pdf_file))
-            print(f"Extracted {len(text)} characters")
+            # Reuse a previous extraction of the same bytes if we have one
+            key, extraction = cache.get(pdf_file, {"engine": "simple", "max_pages": max_pages})
+            if extraction is None:
+                # Extract text
+                pages = extract_pages_from_pdf(str(pdf_file), page_workers)
+                
+                # Extract sections
+                sections = extract_sections_simple(pages or [])
+                extraction = {"pages": pages or [], "sections": sections, "tables": [], "images": []}
+                if pages is not None:
+                    cache.put(key, extraction)
+            else:
+                print(f"Cache hit: {pdf_file.name}")
             
-            # Extract sections
-            sections = extract_sections_simple(text)
+            text = "".join(page_text + "\n" for page_text in extraction["pages"])
+            sections = extraction["sections"]
+            print(f"Extracted {len(text)} characters")
             print(f"Found {len(sections)} sections")
             
             # Rank sections
@@ -201,14 +237,13 @@ def process_pdfs_simple(session_dir):
                     "persona": persona,
                     "job_to_be_done": job_to_be_done,
                     "total_sections": len(ranked_sections),
-                    "processing_time": "completed"
+                    "processing_time": "completed",
+                    "pages_read": len(extraction["pages"])
                 }
             }
             
             # Save to output
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, result)
             
             results.append(result)
             print(f"Completed: {pdf_file.name}")
@@ -247,9 +282,7 @@ def process_pdfs_simple(session_dir):
             }
             
             # Save fallback result
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(fallback_result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, fallback_result)
             
             results.append(fallback_result)
             print(f"Created fallback result for: {pdf_file.name}")
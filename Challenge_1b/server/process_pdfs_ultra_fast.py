@@ -4,23 +4,34 @@ import json
 import os
 from pathlib import Path
 from PyPDF2 import PdfReader
+from extraction_cache import ExtractionCache
+from page_parallel import env_page_workers, extract_pages_parallel
+from output_writer import OutputWriter
 
-def extract_text_fast(pdf_path):
-    """Extract text from PDF - ultra fast version"""
+def extract_pages_fast(pdf_path, page_workers=None):
+    """Extract per-page text from PDF - ultra fast version (None if unreadable)"""
     try:
+        if page_workers is not None:
+            # Page-parallel mode: read every page across worker processes
+            return extract_pages_parallel(pdf_path, page_workers, backend="pypdf2")
         reader = PdfReader(pdf_path)
-        text = ""
+        pages = []
         # Only process first 3 pages for speed
         for i, page in enumerate(reader.pages[:3]):
             try:
-                page_text = page.extract_text() or ""
-                text += page_text + "\n"
-            except:
-                continue
-        return text
+                pages.append(page.extract_text() or "")
+            except Exception:
+                # Keep the page so later pages keep their numbers
+                pages.append("")
+        return pages
     except Exception as e:
         print(f"Error reading PDF: {e}")
-        return ""
+        return None
+
+def extract_text_fast(pdf_path, page_workers=None):
+    """Extract text from PDF - ultra fast version"""
+    pages = extract_pages_fast(pdf_path, page_workers) or []
+    return "".join(page_text + "\n" for page_text in pages)
 
 def create_fast_result(pdf_name, persona, job):
     """Create a fast result without complex processing"""
@@ -91,6 +102,7 @@ def process_pdfs_ultra_fast(session_dir):
     # Create output directory
     output_dir = session_path / "output"
     output_dir.mkdir(parents=True, exist_ok=True)
+    writer = OutputWriter()  # PDF_OUTPUT_FORMAT / PDF_OUTPUT_GZIP
     
     print(f"Processing from: {input_dir}")
     
@@ -119,23 +131,33 @@ def process_pdfs_ultra_fast(session_dir):
     print(f"Job: {job_to_be_done}")
     
     results = []
+    cache = ExtractionCache()
+    
+    # PDF_PAGE_WORKERS lifts the 3-page cap and reads pages in parallel
+    page_workers = env_page_workers()
+    max_pages = None if page_workers is not None else 3
     
     # Process each PDF - ultra fast
     for pdf_file in input_dir.glob("*.pdf"):
         print(f"Processing: {pdf_file.name}")
         
         try:
-            # Extract minimal text for speed
-            text = extract_text_fast(str(pdf_file))
+            # Extract minimal text for speed, reusing a cached extraction if any
+            key, extraction = cache.get(pdf_file, {"engine": "ultra_fast", "max_pages": max_pages})
+            if extraction is None:
+                pages = extract_pages_fast(str(pdf_file), page_workers)
+                extraction = {"pages": pages or [], "sections": [], "tables": [], "images": []}
+                if pages is not None:
+                    cache.put(key, extraction)
+            text = "".join(page_text + "\n" for page_text in extraction["pages"])
             print(f"Extracted {len(text)} characters")
             
             # Create fast result
             result = create_fast_result(pdf_file.name, persona, job_to_be_done)
+            result["metadata"]["pages_read"] = len(extraction["pages"])
             
             # Save to output
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, result)
             
             results.append(result)
             print(f"Completed: {pdf_file.name}")
@@ -146,9 +168,7 @@ def process_pdfs_ultra_fast(session_dir):
             fallback_result = create_fast_result(pdf_file.name, persona, job_to_be_done)
             
             # Save fallback result
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(fallback_result, f, ensure_ascii=False, indent=2)
+            output_file = writer.write(output_dir, pdf_file.stem, fallback_result)
             
             results.append(fallback_result)
             print(f"Created fallback result for: {pdf_file.name}")
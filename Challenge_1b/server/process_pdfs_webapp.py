@@ -1,201 +1,496 @@
+import argparse
 import json
+import os
 import sys
+import time
 from pathlib import Path
-from PyPDF2 import PdfReader
-import pdfplumber
-import fitz  # PyMuPDF
-import re
-import os
+from pdf_session import PdfSession
+from batch import resolve_workers, run_batch
+from extraction_cache import ExtractionCache
+from page_parallel import env_page_workers, extract_pages_parallel
+from streaming import iter_page_batches, iter_page_texts, iter_sections, write_ndjson_record
+from bm25 import BM25Index, section_text
+from scoring import SCORINGS, new_index, resolve_scoring
+from query import compile_query
+from segment import paragraph_spans, sentence_spans
+from page_store import PageStore, pages_path
+from table_filter import env_full_table_scan
+from headings import font_headings_available
+from memory import MemoryBudget, env_max_memory_mb
+from output_writer import FORMATS, OutputWriter, index_path
+from manifest import Manifest, load_output_extraction
+from stages import STAGES, add_stages_argument, env_stages, load_stages, parse_stages
+from metrics import QUIET, NORMAL, VERBOSE, StageTimer, get_verbosity, log, set_verbosity, write_metrics
 
-def extract_sections(text):
-    """Extract sections from text with better heuristics"""
-    lines = text.split('\n')
-    sections = []
-    current_section = []
-    current_title = "Introduction"
+# Only the first MAX_PAGES pages of each PDF are read, for performance,
+# unless page-parallel mode (page_workers) is on
+MAX_PAGES = 10
+
+# Collection mode: sections kept in challenge1b_output.json, and the
+# length of each one's refined text
+TOP_SECTIONS = 5
+# challenge1b_output.json only reports ranked sections, so collection mode
+# never extracts tables or images
+COLLECTION_STAGES = ("text", "sections", "rank")
+REFINED_TEXT_CHARS = 1000
+
+# Keywords for different personas
+PERSONA_KEYWORDS = {
+    'Travel Planner': ['travel', 'trip', 'destination', 'hotel', 'flight', 'booking', 'itinerary', 'tourist', 'vacation', 'holiday'],
+    'Food Contractor': ['menu', 'food', 'catering', 'recipe', 'ingredients', 'cooking', 'meal', 'breakfast', 'lunch', 'dinner', 'restaurant'],
+    'Business Analyst': ['business', 'strategy', 'market', 'analysis', 'financial', 'revenue', 'profit', 'growth', 'competition', 'industry'],
+    'Student': ['study', 'education', 'learning', 'course', 'assignment', 'research', 'academic', 'university', 'college', 'school'],
+    'Researcher': ['research', 'study', 'analysis', 'data', 'findings', 'methodology', 'results', 'conclusion', 'experiment', 'survey']
+}
+
+def is_heading_line(line):
+    """Check if a (stripped, non-empty) line looks like a heading"""
+    return (
+        line.isupper() or 
+        line.startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')) or
+        line.startswith(('I.', 'II.', 'III.', 'IV.', 'V.', 'VI.', 'VII.', 'VIII.', 'IX.', 'X.')) or
+        (len(line) < 100 and line.endswith(':')) or
+        (len(line) < 80 and line.isupper()) or
+        line.startswith(('Chapter', 'Section', 'Part', 'Introduction', 'Conclusion', 'Summary'))
+    )
+
+def extract_sections(pages, headings=None):
+    """Extract sections from text with better heuristics
+
+    pages is a list of page texts (a plain string counts as one page); each
+    section records the pages and character offsets it spans. headings
+    holds font-detected heading offsets per page number (see
+    headings.page_layout); other pages use is_heading_line.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
+    return list(iter_sections(enumerate(pages, 1), is_heading_line, headings))
+
+def score_section(section, query):
+    """Keyword relevance score of one section for a compiled Query"""
+    content_counts = query.match_counts(section['content'])
+    title_counts = query.match_counts(section['title'])
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check if line looks like a heading
-        is_heading = (
-            line.isupper() or 
-            line.startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')) or
-            line.startswith(('I.', 'II.', 'III.', 'IV.', 'V.', 'VI.', 'VII.', 'VIII.', 'IX.', 'X.')) or
-            (len(line) < 100 and line.endswith(':')) or
-            (len(line) < 80 and line.isupper()) or
-            line.startswith(('Chapter', 'Section', 'Part', 'Introduction', 'Conclusion', 'Summary'))
-        )
-        
-        if is_heading:
-            if current_section:
-                sections.append({
-                    'title': current_title,
-                    'content': '\n'.join(current_section),
-                    'page': 1  # We'll update this later
-                })
-            current_title = line
-            current_section = [line]
-        else:
-            current_section.append(line)
+    # Persona keywords in content and title, job keywords in content
+    score = 2 * query.persona_hits(content_counts) + 3 * query.persona_hits(title_counts)
+    score += query.job_hits(content_counts)
     
-    if current_section:
-        sections.append({
-            'title': current_title,
-            'content': '\n'.join(current_section),
-            'page': 1
-        })
+    # Bonus for longer, more detailed sections
+    if len(section['content']) > 200:
+        score += 1
     
-    return sections
+    return score
+
+def rank_sections(sections, query, scores=None):
+    """Rank sections by BM25 relevance to the compiled persona/job query
 
-def rank_sections(sections, persona, job_to_be_done):
-    """Rank sections based on relevance to persona and job"""
+    scores can be passed in from a collection-wide BM25Index; otherwise the
+    sections are indexed on their own.
+    """
     if not sections:
         return []
     
-    # Keywords for different personas
-    persona_keywords = {
-        'Travel Planner': ['travel', 'trip', 'destination', 'hotel', 'flight', 'booking', 'itinerary', 'tourist', 'vacation', 'holiday'],
-        'Food Contractor': ['menu', 'food', 'catering', 'recipe', 'ingredients', 'cooking', 'meal', 'breakfast', 'lunch', 'dinner', 'restaurant'],
-        'Business Analyst': ['business', 'strategy', 'market', 'analysis', 'financial', 'revenue', 'profit', 'growth', 'competition', 'industry'],
-        'Student': ['study', 'education', 'learning', 'course', 'assignment', 'research', 'academic', 'university', 'college', 'school'],
-        'Researcher': ['research', 'study', 'analysis', 'data', 'findings', 'methodology', 'results', 'conclusion', 'experiment', 'survey']
-    }
-    
-    # Get keywords for the persona
-    keywords = persona_keywords.get(persona, [])
-    
-    # Score each section
-    scored_sections = []
-    for i, section in enumerate(sections):
-        score = 0
-        content_lower = section['content'].lower()
-        title_lower = section['title'].lower()
-        
-        # Score based on keywords in content
-        for keyword in keywords:
-            if keyword in content_lower:
-                score += 2
-            if keyword in title_lower:
-                score += 3
-        
-        # Score based on job keywords
-        job_words = job_to_be_done.lower().split()
-        for word in job_words:
-            if len(word) > 3 and word in content_lower:
-                score += 1
-        
-        # Bonus for longer, more detailed sections
-        if len(section['content']) > 200:
-            score += 1
-        
-        scored_sections.append({
-            **section,
-            'score': score,
-            'rank': 0  # Will be set after sorting
-        })
+    if scores is None:
+        index = BM25Index(section_text(section) for section in sections)
+        scores = index.score(query.terms)
     
     # Sort by score (highest first)
-    scored_sections.sort(key=lambda x: x['score'], reverse=True)
+    order = sorted(range(len(sections)), key=lambda i: scores[i], reverse=True)
     
     # Assign ranks
-    for i, section in enumerate(scored_sections):
-        section['rank'] = i + 1
+    ranked_sections = []
+    for rank, i in enumerate(order):
+        ranked_sections.append({
+            **sections[i],
+            'score': round(scores[i], 4),
+            'rank': rank + 1
+        })
     
-    return scored_sections
+    return ranked_sections
 
-def analyze_subsections(section_content, persona, job_to_be_done):
-    """Analyze subsections within a section"""
-    # Split content into paragraphs
-    paragraphs = [p.strip() for p in section_content.split('\n\n') if p.strip()]
-    
+def subsection_spans(section_content):
+    """(paragraph number, start, end) of the paragraphs analyze_subsections
+    reports on: the first 5, skipping very short ones"""
+    return [(number, start, end) for number, (start, end) in zip(range(1, 6), paragraph_spans(section_content))
+            if end - start >= 50]
+
+def subsection_paragraphs(section_content):
+    """(paragraph number, text) of the paragraphs analyze_subsections reports on"""
+    return [(number, section_content[start:end]) for number, start, end in subsection_spans(section_content)]
+
+def analyze_subsections(section_content, query, scores=None):
+    """Analyze subsections within a section
+
+    scores, one per subsection_paragraphs() entry, replace the keyword
+    count as each paragraph's relevance_score (e.g. TF-IDF scores computed
+    for the whole collection at once). Paragraphs and sentences are offsets
+    into section_content; only the preview and key points are copied out.
+    """
     insights = []
-    for i, paragraph in enumerate(paragraphs[:5]):  # Limit to first 5 paragraphs
-        if len(paragraph) < 50:  # Skip very short paragraphs
-            continue
-            
+    for n, (number, start, end) in enumerate(subsection_spans(section_content)):
         # Simple insight generation based on content
         insight = {
-            'paragraph': i + 1,
-            'content': paragraph[:200] + '...' if len(paragraph) > 200 else paragraph,
+            'paragraph': number,
+            'content': section_content[start:start + 200] + '...' if end - start > 200 else section_content[start:end],
             'key_points': [],
             'relevance_score': 0
         }
         
-        # Extract key points (simple approach)
-        sentences = paragraph.split('. ')
+        # Extract key points: the first 3 sentences, unless very short
         key_points = []
-        for sentence in sentences[:3]:  # Take first 3 sentences as key points
-            if len(sentence) > 20:
-                key_points.append(sentence.strip())
+        for _, (sentence_start, sentence_end) in zip(range(3), sentence_spans(section_content, start, end)):
+            if sentence_end - sentence_start > 20:
+                key_points.append(section_content[sentence_start:sentence_end])
         
         insight['key_points'] = key_points
         
-        # Calculate relevance score
-        content_lower = paragraph.lower()
-        score = 0
-        
-        # Score based on persona keywords
-        persona_keywords = {
-            'Travel Planner': ['travel', 'trip', 'destination', 'hotel', 'flight'],
-            'Food Contractor': ['menu', 'food', 'catering', 'recipe', 'ingredients'],
-            'Business Analyst': ['business', 'strategy', 'market', 'analysis', 'financial'],
-            'Student': ['study', 'education', 'learning', 'course', 'assignment'],
-            'Researcher': ['research', 'study', 'analysis', 'data', 'findings']
-        }
-        
-        keywords = persona_keywords.get(persona, [])
-        for keyword in keywords:
-            if keyword in content_lower:
-                score += 1
-        
-        insight['relevance_score'] = score
+        if scores is not None:
+            insight['relevance_score'] = round(scores[n], 4)
+        else:
+            # Relevance: how many persona keywords the paragraph mentions
+            insight['relevance_score'] = query.persona_hits(query.match_counts(section_content, start, end))
         insights.append(insight)
     
     return insights
 
-def extract_tables(pdf_path):
+def extract_tables(session, full_scan=False, pages=None):
     tables = []
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_tables = page.extract_tables()
-                for table in page_tables:
-                    tables.append({"page": i+1, "data": table})
+        tables = session.extract_tables(full_scan, pages)
     except Exception as e:
-        print(f"Error extracting tables from {pdf_path}: {e}")
+        log(f"Error extracting tables from {session.path}: {e}", QUIET)
     return tables
 
-def extract_images(pdf_path, output_dir):
+def extract_images(session, output_dir, pages=None, stored=None):
     images = []
     try:
-        doc = fitz.open(pdf_path)
-        images_dir = output_dir / "images"
-        images_dir.mkdir(parents=True, exist_ok=True)
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            for img_index, img in enumerate(page.get_images(full=True)):
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                ext = base_image["ext"]
-                image_filename = f"page{page_num+1}_img{img_index+1}.{ext}"
-                image_path = images_dir / image_filename
-                with open(image_path, "wb") as img_file:
-                    img_file.write(image_bytes)
-                images.append({"page": page_num+1, "image_file": f"images/{image_filename}"})
+        images = session.extract_images(output_dir, pages, stored)
     except Exception as e:
-        print(f"Error extracting images from {pdf_path}: {e}")
+        log(f"Error extracting images from {session.path}: {e}", QUIET)
     return images
 
-def process_pdfs_webapp(session_dir):
-    """Process PDFs for webapp with flexible directory structure"""
-    session_path = Path(session_dir)
+def pages_before(deadline, pages, extraction):
+    """Page indexes from pages while time.perf_counter() is before deadline;
+    marks the extraction "truncated" if the deadline cuts them short"""
+    for page_index in pages:
+        if deadline is not None and time.perf_counter() > deadline:
+            extraction["truncated"] = True
+            return
+        yield page_index
+
+def extract_document(pdf_file, output_dir, page_workers=None, timer=None, full_table_scan=False, depth=None,
+                     stages=STAGES):
+    """Extract per-page text, sections, tables and images from one PDF
+
+    Time spent in each stage (open, text, sections, tables, images) is
+    added to timer. full_table_scan runs table detection on every page
+    instead of only pages whose drawings could form a table. depth (see
+    scheduler.DEPTHS) sets how many pages are read and whether tables and
+    images are extracted, from those pages only; if it has a "deadline",
+    every stage stops there and the extraction is marked "truncated".
+    stages (see stages.STAGES) leaves out sections, tables or images.
+    """
+    timer = timer or StageTimer()
+    # Open the PDF once; text, tables and images all read from this parse
+    session = None
+    pages = []
+    extraction = {}
+    # Font-aware headings come from the same page parse as the text
+    headings = {} if "sections" in stages and font_headings_available() else None
+    deadline = depth.get("deadline") if depth else None
+    try:
+        log(f"  Reading PDF: {pdf_file.name}", VERBOSE)
+        with timer.stage("open"):
+            session = PdfSession(pdf_file)
+        with timer.stage("text"):
+            if page_workers is not None:
+                # Read every page, with page ranges spread across worker processes
+                log(f"  Total pages: {session.page_count}, Processing: all", VERBOSE)
+                pages = extract_pages_parallel(pdf_file, page_workers, layout=headings is not None)
+                if headings is not None:
+                    headings = {n: offsets for n, (_, offsets) in enumerate(pages, 1) if offsets is not None}
+                    pages = [page_text for page_text, _ in pages]
+            else:
+                # Extract text (limit to first MAX_PAGES pages for performance)
+                max_pages = depth["max_pages"] if depth else MAX_PAGES
+                pages_to_process = session.page_count if max_pages is None else min(session.page_count, max_pages)
+                log(f"  Total pages: {session.page_count}, Processing: {pages_to_process}", VERBOSE)
+                
+                for j in pages_before(deadline, range(pages_to_process), extraction):
+                    try:
+                        log(f"    Reading page {j+1}/{pages_to_process}", VERBOSE)
+                        if headings is None:
+                            pages.append(session.page_text(j))
+                        else:
+                            page_text, offsets = session.page_layout(j)
+                            pages.append(page_text)
+                            if offsets is not None:
+                                headings[j + 1] = offsets
+                    except Exception as e:
+                        log(f"    Error reading page {j+1}: {e}", QUIET)
+                        pages.append("")
+            text = "\n".join(pages)
+        log(f"  Text extracted: {len(text)} characters", VERBOSE)
+    except Exception as e:
+        log(f"Error reading PDF {pdf_file.name}: {e}", QUIET)
+        text = f"Error reading PDF: {e}"
+        extraction["error"] = text
+    
+    # Extract sections
+    sections = []
+    if "sections" in stages:
+        with timer.stage("sections"):
+            if "error" in extraction:
+                sections = extract_sections(text)
+            else:
+                sections = extract_sections(pages, headings)
+        log(f"  Sections found: {len(sections)}", VERBOSE)
+    
+    # Extract tables and images from the already-open document
+    tables = []
+    images = []
+    if session is not None:
+        scan_pages = None
+        if "tables" in stages and (not depth or depth["tables"]):
+            with timer.stage("tables"):
+                if depth:
+                    scan_pages = pages_before(deadline, range(len(pages)), extraction)
+                tables = extract_tables(session, full_table_scan, scan_pages)
+            log(f"  Tables found: {len(tables)}", VERBOSE)
+        
+        if "images" in stages and (not depth or depth["images"]):
+            with timer.stage("images"):
+                if depth:
+                    scan_pages = pages_before(deadline, range(len(pages)), extraction)
+                images = extract_images(session, output_dir, scan_pages)
+            log(f"  Images found: {len(images)}", VERBOSE)
+        session.close()
+    
+    extraction.update({"pages": pages, "sections": sections, "tables": tables, "images": images})
+    return extraction
+
+def load_or_extract(pdf_file, output_dir, cache, page_workers=None, full_table_scan=False, depth=None,
+                    stages=STAGES):
+    """Serve a document's extraction from the cache, extracting it on a miss
+
+    The returned extraction carries the stage timings of this run under
+    "timings" (a "cache" stage only, on a hit); they are never cached.
+    depth and stages are passed on to extract_document and are part of the
+    cache key.
+    """
+    timer = StageTimer()
+    max_pages = None if page_workers is not None else MAX_PAGES
+    settings = {"engine": "webapp", "max_pages": max_pages,
+                "table_scan": "full" if full_table_scan else "prefilter",
+                "headings": "font" if font_headings_available() else "text"}
+    if depth:
+        settings.update({"max_pages": depth["max_pages"], "depth": depth["name"]})
+    if stages != STAGES:
+        settings["stages"] = list(stages)
+    with timer.stage("cache"):
+        key, extraction = cache.get(pdf_file, settings)
+        if extraction is not None:
+            try:
+                cache.restore_images(key, extraction, output_dir)
+                log(f"  Cache hit: {pdf_file.name}", VERBOSE)
+            except OSError as e:
+                log(f"  Cache entry for {pdf_file.name} is incomplete: {e}", QUIET)
+                extraction = None
+    
+    if extraction is None:
+        extraction = extract_document(pdf_file, output_dir, page_workers, timer, full_table_scan, depth, stages)
+        # A deadline-truncated extraction is not what this depth normally gives
+        if "error" not in extraction and not extraction.get("truncated"):
+            with timer.stage("cache"):
+                cache.put(key, extraction, output_dir)
+    extraction["timings"] = timer.timings
+    return extraction
+
+def extract_pdf_file(pdf_file, output_dir, options):
+    """Extraction for one PDF; runs inside a batch worker"""
+    set_verbosity(options["verbosity"])
+    log(f"Processing: {pdf_file.name}")
+    cache = ExtractionCache(enabled=None if options["use_cache"] else False)
+    return load_or_extract(pdf_file, output_dir, cache, options["page_workers"],
+                           options["full_table_scan"], stages=options["stages"])
+
+def write_pdf_output(pdf_file, output_dir, extraction, ranked_sections, query, timer=None, writer=None,
+                     subsections=True, metadata=None):
+    """Analyze subsections of ranked sections and write the PDF's JSON output
+
+    Subsections and serialize are timed into timer. The output metadata
+    gets every stage timed before writing starts; the serialize time is
+    only known afterwards, so it is left to the metrics file. writer picks
+    the output format (compact JSON by default). subsections=False leaves
+    every section's subsection_analysis empty; metadata is merged into the
+    output metadata.
+    """
+    timer = timer or StageTimer()
+    writer = writer or OutputWriter()
+    # Extractions rebuilt from an earlier output may only have its content
+    text = extraction.get("error") or "\n".join(extraction["pages"]) or extraction.get("content", "")
+    
+    # Analyze subsections for each ranked section
+    with timer.stage("subsections"):
+        for section in ranked_sections:
+            paragraph_scores = section.pop('paragraph_scores', None)
+            if subsections:
+                section['subsection_analysis'] = analyze_subsections(section['content'], query, paragraph_scores)
+            else:
+                section['subsection_analysis'] = []
+    
+    # Build output
+    data = {
+        "filename": pdf_file.name,
+        "content": text[:10000],  # Limit content size
+        "sections": ranked_sections,
+        "tables": extraction["tables"],
+        "images": extraction["images"],
+        "metadata": {
+            "persona": query.persona,
+            "job_to_be_done": query.job_to_be_done,
+            "total_sections": len(ranked_sections),
+            "processing_time": round(timer.total(), 4),
+            "timings": timer.rounded(),
+            "pages_read": len(extraction["pages"]),
+            **(metadata or {})
+        }
+    }
+    
+    # Save to output directory
+    with timer.stage("serialize"):
+        output_file = writer.write(output_dir, pdf_file.stem, data)
+        
+        # Per-page text store that section offsets point into
+        if extraction["pages"]:
+            PageStore(extraction["pages"]).save(pages_path(output_dir, pdf_file.stem), pdf_file.name)
+    return output_file
+
+def document_metrics_record(pdf_file, timer):
+    return {
+        "filename": pdf_file.name,
+        "total": round(timer.total(), 4),
+        "timings": timer.rounded()
+    }
+
+def stream_pdf_file(pdf_file, output_dir, query, options):
+    """Stream one PDF's sections to <stem>.ndjson as each one closes
+
+    Pages are read one at a time and every section is scored, analysed and
+    written as soon as the next heading ends it, so memory is bounded by the
+    largest section rather than the whole document. Ranks need all scores,
+    so they go in the closing summary record along with tables and images.
+    Returns (output_file, StageTimer, image entries).
+
+    With options["max_memory_mb"] set, pages are read in batches; each
+    batch's tables and images are written as "table" and "image" records
+    right away and the page cache is released before the next batch, so
+    memory stays flat however long the document is. The summary then
+    carries counts and a memory report instead of the lists.
+    Sections are what is streamed, so of options["stages"] only tables
+    and images can be left out.
+    """
+    set_verbosity(options["verbosity"])
+    log(f"Streaming: {pdf_file.name}")
+    timer = StageTimer()
+    max_pages = None if options["page_workers"] is not None else MAX_PAGES
+    output_file = output_dir / f"{pdf_file.stem}.ndjson"
+    scores = []
+    # Streamed output is not indexed; drop the index of an earlier json run
+    try:
+        os.remove(index_path(output_file))
+    except FileNotFoundError:
+        pass
+    
+    with timer.stage("open"):
+        session = PdfSession(pdf_file)
+    with session, open(output_file, "w", encoding="utf-8") as f:
+        write_ndjson_record(f, {
+            "type": "document",
+            "filename": pdf_file.name,
+            "total_pages": session.page_count,
+            "metadata": {"persona": query.persona, "job_to_be_done": query.job_to_be_done}
+        })
+        
+        section_timer = StageTimer()
+        batch_timer = StageTimer()
+        budget = None
+        table_count = 0
+        image_count = 0
+        headings = {} if font_headings_available() else None
+        if options["max_memory_mb"]:
+            budget = MemoryBudget(options["max_memory_mb"], options["batch_pages"])
+            image_xrefs = {}
+            
+            def on_batch(batch):
+                nonlocal table_count, image_count
+                batch_tables = []
+                batch_images = []
+                if "tables" in options["stages"]:
+                    with batch_timer.stage("tables"):
+                        batch_tables = extract_tables(session, options["full_table_scan"], batch)
+                if "images" in options["stages"]:
+                    with batch_timer.stage("images"):
+                        batch_images = extract_images(session, output_dir, batch, image_xrefs)
+                with batch_timer.stage("serialize"):
+                    for table in batch_tables:
+                        write_ndjson_record(f, {"type": "table", **table})
+                    for image in batch_images:
+                        write_ndjson_record(f, {"type": "image", **image})
+                table_count += len(batch_tables)
+                image_count += len(batch_images)
+            
+            pages = iter_page_batches(session, budget, max_pages, on_batch, headings)
+        else:
+            pages = iter_page_texts(session, max_pages, headings)
+        loop_started = time.perf_counter()
+        for index, section in enumerate(iter_sections(pages, is_heading_line, headings)):
+            with section_timer.stage("ranking"):
+                section['score'] = score_section(section, query)
+            with section_timer.stage("subsections"):
+                section['subsection_analysis'] = analyze_subsections(section['content'], query)
+            with section_timer.stage("serialize"):
+                write_ndjson_record(f, {"type": "section", "index": index, **section})
+            scores.append(section['score'])
+        # Pages are read and split into sections in between; that is "text"
+        timer.add("text", time.perf_counter() - loop_started - section_timer.total() - batch_timer.total())
+        timer.update(section_timer.timings)
+        timer.update(batch_timer.timings)
+        
+        summary = {"type": "summary"}
+        if budget is None:
+            tables = []
+            images = []
+            if "tables" in options["stages"]:
+                with timer.stage("tables"):
+                    tables = extract_tables(session, options["full_table_scan"])
+            if "images" in options["stages"]:
+                with timer.stage("images"):
+                    images = extract_images(session, output_dir)
+            summary.update({"tables": tables, "images": images})
+            table_count = len(tables)
+            image_count = len(images)
+        else:
+            summary["memory"] = budget.report()
+            # Every distinct image file the batches stored, for the manifest
+            images = [{"image_file": f"images/{filename}"} for filename, _ in image_xrefs.values()]
+        
+        # Same order rank_sections gives: stable sort by score, highest first
+        ranking = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        summary.update({
+            "ranking": ranking,
+            "total_sections": len(scores),
+            "total_tables": table_count,
+            "total_images": image_count,
+            "timings": timer.rounded()
+        })
+        write_ndjson_record(f, summary)
     
+    return output_file, timer, images
+
+def find_input_dir(session_path):
+    """The directory holding a session's PDFs, or None"""
     # Look for input directory in various possible locations
-    input_dir = None
     possible_input_dirs = [
         session_path / "input",
         session_path / "pdfs",
@@ -204,121 +499,440 @@ def process_pdfs_webapp(session_dir):
     
     for dir_path in possible_input_dirs:
         if dir_path.exists() and any(dir_path.glob("*.pdf")):
-            input_dir = dir_path
-            break
+            return dir_path
+    return None
+
+def read_session_input(session_path):
+    """Persona and job from the session's input.json, with defaults"""
+    persona = "Food Contractor"  # Default
+    job_to_be_done = "Analyze document content"  # Default
+    
+    # Try to read input.json for persona and job info
+    input_file = session_path / "input.json"
+    if input_file.exists():
+        try:
+            with open(input_file, 'r') as f:
+                input_data = json.load(f)
+                persona = input_data.get('persona', persona)
+                job_to_be_done = input_data.get('jobToBeDone', job_to_be_done)
+            log(f"Using persona: {persona}")
+            log(f"Using job: {job_to_be_done}")
+        except Exception as e:
+            log(f"Error reading input.json: {e}", QUIET)
+    return persona, job_to_be_done
+
+def process_pdfs_webapp(session_dir, workers=1, use_cache=True, page_workers=None, stream=False,
+                        verbosity=None, metrics_file=None, full_table_scan=None, on_progress=None,
+                        max_memory_mb=None, batch_pages=None, output_format=None, gzip_output=None,
+                        scoring=None, incremental=True, stages=None):
+    """Process PDFs for webapp with flexible directory structure
+
+    workers spreads documents across processes; page_workers switches on
+    page-parallel mode, which reads every page of each document (no
+    MAX_PAGES cap) with page ranges split across that many processes.
+    stream writes sections as NDJSON while pages are still being read.
+    verbosity is QUIET, NORMAL or VERBOSE (per-stage and per-page
+    progress); metrics_file receives every document's stage timings.
+    full_table_scan disables the table prefilter (default: PDF_TABLE_SCAN).
+    on_progress(event) is called as each document is extracted, written or
+    fails, with event = {"document", "status", "total"}.
+    max_memory_mb switches on memory-bounded mode (default: PDF_MAX_MEMORY_MB):
+    output is streamed, pages are read batch_pages at a time and each
+    worker process keeps its RSS under the ceiling.
+    output_format (json, json-indent, ndjson) and gzip_output choose how
+    each document's output is written (default: PDF_OUTPUT_FORMAT and
+    PDF_OUTPUT_GZIP, i.e. compact JSON).
+    scoring is bm25 or tfidf (default: PDF_SCORING, i.e. bm25); tfidf also
+    scores every subsection paragraph of the collection in one pass.
+    Stream mode scores sections one at a time and ignores it.
+    incremental uses the output directory's manifest to process only new
+    or changed PDFs: outputs of PDFs that are gone are deleted, and the
+    unchanged ones are re-ranked from their earlier outputs, without
+    reading the PDF again, so collection-wide ranks stay current.
+    stages selects pipeline stages (a list or "text,sections,..."; default
+    PDF_STAGES or all of stages.STAGES). Only the backends of the selected
+    stages are imported, and the import time of each is logged and added
+    to the metrics file.
+    Returns the names of the PDFs whose outputs are up to date.
+    """
+    if verbosity is not None:
+        set_verbosity(verbosity)
+    session_path = Path(session_dir)
     
+    input_dir = find_input_dir(session_path)
     if not input_dir:
-        print(f"No PDF files found in session directory: {session_dir}")
+        log(f"No PDF files found in session directory: {session_dir}", QUIET)
         return
     
     # Create output directory
     output_dir = session_path / "output"
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    print(f"Processing PDFs from: {input_dir}")
-    print(f"Output directory: {output_dir}")
+    log(f"Processing PDFs from: {input_dir}")
+    log(f"Output directory: {output_dir}")
     
-    processed_files = []
+    persona, job_to_be_done = read_session_input(session_path)
     
-    pdf_files = list(input_dir.glob("*.pdf"))
+    pdf_files = sorted(input_dir.glob("*.pdf"))
     total_files = len(pdf_files)
+    workers = resolve_workers(workers, total_files)
+    log(f"Processing {total_files} files with {workers} worker(s)")
     
-    for i, pdf_file in enumerate(pdf_files):
-        print(f"Processing: {pdf_file.name} ({i+1}/{total_files})")
-        
+    writer = OutputWriter(output_format, gzip_output)
+    
+    # Compile the persona/job query once for every document and section
+    query = compile_query(persona, job_to_be_done, PERSONA_KEYWORDS)
+    if full_table_scan is None:
+        full_table_scan = env_full_table_scan()
+    if max_memory_mb is None:
+        max_memory_mb = env_max_memory_mb()
+    if max_memory_mb:
+        # Whole-collection ranking needs every section in memory; streaming does not
+        stream = True
+        log(f"Memory-bounded mode: {max_memory_mb} MB per process, streaming output")
+    scoring = resolve_scoring(scoring)
+    stages = parse_stages(stages) if stages else env_stages()
+    if stream and scoring != "bm25":
+        log(f"Stream mode scores sections as they close; --scoring {scoring} is ignored", QUIET)
+    if stream and not {"sections", "rank"} <= set(stages):
+        log("Stream mode always splits and ranks sections; only tables and images can be left out", QUIET)
+    options = {"use_cache": use_cache, "page_workers": page_workers, "stream": stream,
+               "verbosity": get_verbosity(), "full_table_scan": full_table_scan,
+               "max_memory_mb": max_memory_mb, "batch_pages": batch_pages, "stages": stages}
+    processed_files = []
+    document_metrics = []
+    
+    # Everything the outputs depend on besides the PDFs and the query. A new
+    # persona or job re-ranks the stored extractions, except in stream mode,
+    # where scores are written as the PDF is read
+    settings = {
+        "engine": "webapp", "max_pages": None if page_workers is not None else MAX_PAGES,
+        "table_scan": "full" if full_table_scan else "prefilter",
+        "headings": "font" if font_headings_available() else "text",
+        "stream": stream, "memory_bounded": bool(max_memory_mb), "scoring": scoring,
+        "output_format": writer.format, "gzip": writer.compress, "stages": list(stages)
+    }
+    if stream:
+        settings.update({"persona": persona, "job_to_be_done": job_to_be_done})
+    manifest = Manifest(output_dir, settings)
+    new_query = manifest.query != [persona, job_to_be_done]
+    manifest.query = [persona, job_to_be_done]
+    changed, unchanged, removed = manifest.plan(pdf_files)
+    if not incremental:
+        changed, unchanged = pdf_files, []
+    for name in removed:
+        manifest.forget(name)
+        log(f"Removed outputs of deleted input: {name}")
+    if not changed and not removed and (stream or not new_query):
+        manifest.save()
+        log(f"All {total_files} files are up to date.")
+        return [pdf_file.name for pdf_file in pdf_files]
+    if unchanged:
+        log(f"{len(changed)} new or changed, {len(unchanged)} unchanged, {len(removed)} removed")
+    # Backends are only needed for documents that will be read; a re-rank of
+    # unchanged ones imports nothing up front
+    import_timer = load_stages(stages, scoring) if changed else StageTimer()
+    
+    def report(batch, status):
+        # Progress callback for run_batch: status of batch[index]
+        def on_done(index, result, error):
+            if on_progress:
+                on_progress({"document": batch[index].name, "status": "failed" if error else status,
+                             "total": total_files})
+        return on_done
+    
+    if stream:
+        # Stream outputs are per document, so unchanged ones stay as they are
+        results = run_batch(stream_pdf_file, changed, (output_dir, query, options), workers,
+                            on_done=report(changed, "completed"))
+        for i, (pdf_file, (result, error)) in enumerate(zip(changed, results)):
+            if error:
+                log(f"Error processing {pdf_file.name} ({i+1}/{len(changed)}): {error}", QUIET)
+                continue
+            output_file, timer, images = result
+            manifest.record(pdf_file, [output_file], images)
+            document_metrics.append(document_metrics_record(pdf_file, timer))
+            log(f"Completed: {pdf_file.name} -> {output_file} ({i+1}/{len(changed)})")
+        manifest.save()
+        if metrics_file:
+            write_metrics(metrics_file, document_metrics, {"imports": import_timer.rounded()})
+        processed_files = [pdf_file.name for pdf_file in pdf_files if pdf_file.name in manifest.entries]
+        log(f"Processing complete. {len(document_metrics)} files processed.")
+        return processed_files
+    
+    # Unchanged documents come back from their earlier outputs
+    previous = {}
+    for pdf_file in unchanged:
         try:
-            # Extract text (limit to first 10 pages for performance)
-            print(f"  Reading PDF: {pdf_file.name}")
-            reader = PdfReader(str(pdf_file))
-            pages_to_process = min(len(reader.pages), 10)  # Limit to first 10 pages
-            print(f"  Total pages: {len(reader.pages)}, Processing: {pages_to_process}")
-            
-            text_parts = []
-            for j in range(pages_to_process):
-                try:
-                    print(f"    Reading page {j+1}/{pages_to_process}")
-                    page_text = reader.pages[j].extract_text() or ""
-                    text_parts.append(page_text)
-                except Exception as e:
-                    print(f"    Error reading page {j+1}: {e}")
-            text = "\n".join(text_parts)
-            print(f"  Text extracted: {len(text)} characters")
-        except Exception as e:
-            print(f"Error reading PDF {pdf_file.name}: {e}")
-            text = f"Error reading PDF: {e}"
-        
-        # Extract sections
-        print(f"  Extracting sections...")
-        sections = extract_sections(text)
-        print(f"  Sections found: {len(sections)}")
-        
-        # Get persona and job from session metadata (if available)
-        persona = "Food Contractor"  # Default
-        job_to_be_done = "Analyze document content"  # Default
-        
-        # Try to read input.json for persona and job info
-        input_file = session_path / "input.json"
-        if input_file.exists():
-            try:
-                with open(input_file, 'r') as f:
-                    input_data = json.load(f)
-                    persona = input_data.get('persona', persona)
-                    job_to_be_done = input_data.get('jobToBeDone', job_to_be_done)
-                print(f"  Using persona: {persona}")
-                print(f"  Using job: {job_to_be_done}")
-            except Exception as e:
-                print(f"  Error reading input.json: {e}")
-        
-        # Rank sections based on persona and job
-        print(f"  Ranking sections...")
-        ranked_sections = rank_sections(sections, persona, job_to_be_done)
-        print(f"  Ranked {len(ranked_sections)} sections")
-        
-        # Analyze subsections for each ranked section
-        print(f"  Analyzing subsections...")
-        for section in ranked_sections:
-            section['subsection_analysis'] = analyze_subsections(section['content'], persona, job_to_be_done)
-        
-        # Extract tables
-        print(f"  Extracting tables...")
-        tables = extract_tables(str(pdf_file))
-        print(f"  Tables found: {len(tables)}")
-        
-        # Extract images
-        print(f"  Extracting images...")
-        images = extract_images(str(pdf_file), output_dir)
-        print(f"  Images found: {len(images)}")
-        
-        # Build output
-        data = {
-            "filename": pdf_file.name,
-            "content": text[:10000],  # Limit content size
-            "sections": ranked_sections,
-            "tables": tables,
-            "images": images,
-            "metadata": {
-                "persona": persona,
-                "job_to_be_done": job_to_be_done,
-                "total_sections": len(ranked_sections),
-                "processing_time": "completed"
-            }
-        }
-        
-        # Save to output directory
-        output_file = output_dir / f"{pdf_file.stem}.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        processed_files.append(pdf_file.name)
-        print(f"Completed: {pdf_file.name} -> {output_file}")
+            previous[pdf_file.name] = load_output_extraction(manifest, pdf_file)
+        except (OSError, ValueError, KeyError) as e:
+            log(f"Earlier output of {pdf_file.name} is unusable, reprocessing: {e}", VERBOSE)
+    changed = [pdf_file for pdf_file in pdf_files if pdf_file.name not in previous]
+    
+    # Extract every new or changed document first (in parallel when workers > 1)
+    results = run_batch(extract_pdf_file, changed, (output_dir, options), workers,
+                        on_done=report(changed, "extracted"))
+    extractions = dict(previous)
+    for i, (pdf_file, (extraction, error)) in enumerate(zip(changed, results)):
+        if error:
+            log(f"Error processing {pdf_file.name} ({i+1}/{len(changed)}): {error}", QUIET)
+            continue
+        extractions[pdf_file.name] = extraction
+    extracted = [(pdf_file, extractions[pdf_file.name]) for pdf_file in pdf_files if pdf_file.name in extractions]
     
-    print(f"Processing complete. {len(processed_files)} files processed.")
+    processed_files, document_metrics, collection_timer = rank_and_write(
+        extracted, output_dir, query, scoring, writer, manifest, on_progress, total_files, "rank" in stages)
+    manifest.save()
+    if metrics_file:
+        write_metrics(metrics_file, document_metrics,
+                      {**collection_timer.rounded(), "imports": import_timer.rounded()})
+    log(f"Processing complete. {len(processed_files)} files processed.")
     return processed_files
 
+def rank_and_write(extracted, output_dir, query, scoring, writer, manifest, on_progress=None, total_files=None,
+                   rank=True):
+    """Rank the sections of extracted [(pdf_file, extraction)] against each
+    other and write every document's output
+
+    This is all of the pipeline that depends on the persona and job, so
+    rerank.py runs it on its own over stored extractions. Each output is
+    recorded in manifest. rank=False (no rank stage) writes the sections
+    in document order, unscored and without subsection analysis. Returns
+    (processed files, per-document metrics, collection-wide StageTimer).
+    """
+    processed_files = []
+    document_metrics = []
+    collection_timer = StageTimer()
+    section_ids = []
+    if rank:
+        # One index over every section in the collection, scored once
+        log(f"Ranking sections ({scoring})...", VERBOSE)
+        with collection_timer.stage("index"):
+            index = new_index(scoring)
+            for pdf_file, extraction in extracted:
+                section_ids.append([index.add(section_text(section)) for section in extraction["sections"]])
+            scores = index.score(query.terms)
+        log(f"Ranked {len(index)} sections across {len(extracted)} files", VERBOSE)
+    
+    if rank and scoring == "tfidf":
+        # Every subsection paragraph of the collection, scored in one pass too
+        with collection_timer.stage("paragraphs"):
+            paragraph_index = new_index(scoring)
+            paragraph_ids = []
+            for pdf_file, extraction in extracted:
+                for section in extraction["sections"]:
+                    paragraph_ids.append([paragraph_index.add(paragraph) for _, paragraph
+                                          in subsection_paragraphs(section['content'])])
+            paragraph_scores = paragraph_index.score(query.terms)
+            ids = iter(paragraph_ids)
+            for pdf_file, extraction in extracted:
+                for section in extraction["sections"]:
+                    # Carried through ranking and consumed by write_pdf_output
+                    section['paragraph_scores'] = [paragraph_scores[i] for i in next(ids)]
+    
+    for n, (pdf_file, extraction) in enumerate(extracted):
+        timer = StageTimer()
+        timer.update(extraction.pop("timings", {}))
+        if rank:
+            with timer.stage("ranking"):
+                ranked_sections = rank_sections(extraction["sections"], query, [scores[i] for i in section_ids[n]])
+        else:
+            ranked_sections = extraction["sections"]
+        output_file = write_pdf_output(pdf_file, output_dir, extraction, ranked_sections, query, timer, writer,
+                                       subsections=rank)
+        if "error" not in extraction:
+            outputs = [output_file]
+            if extraction["pages"]:
+                outputs.append(pages_path(output_dir, pdf_file.stem))
+            manifest.record(pdf_file, outputs, extraction["images"])
+        # An unreadable PDF keeps its error output but stays out of the
+        # manifest, so the next run retries it
+        processed_files.append(pdf_file.name)
+        document_metrics.append(document_metrics_record(pdf_file, timer))
+        if on_progress:
+            on_progress({"document": pdf_file.name, "status": "completed", "total": total_files})
+        log(f"Completed: {pdf_file.name} -> {output_file}")
+    
+    return processed_files, document_metrics, collection_timer
+
+def refine_section_text(section, query, limit=REFINED_TEXT_CHARS):
+    """Section text for subsection_analysis: the paragraphs that mention the
+    query (all of them if none do), whitespace-collapsed and capped at limit"""
+    content = section['content']
+    paragraphs = list(paragraph_spans(content))
+    relevant = [span for span in paragraphs if query.match_counts(content, *span)] or paragraphs
+    text = " ".join(" ".join(content[start:end] for start, end in relevant).split())
+    return text[:limit]
+
+def read_collection_input(collection_path):
+    """Documents, persona and job from a collection's challenge1b_input.json"""
+    with open(collection_path / "challenge1b_input.json", 'r') as f:
+        input_data = json.load(f)
+    documents = [doc["filename"] for doc in input_data.get("documents", [])]
+    persona = input_data.get("persona", {}).get("role", "Food Contractor")
+    job_to_be_done = input_data.get("job_to_be_done", {}).get("task", "Analyze document content")
+    return documents, persona, job_to_be_done
+
+def process_collection(collection_dir, workers=1, use_cache=True, page_workers=None, verbosity=None,
+                       metrics_file=None, top_sections=TOP_SECTIONS,
+                       output_format=None, gzip_output=None, scoring=None):
+    """Process a whole collection (collections/Collection N) as one batch
+
+    The documents, persona and job come from challenge1b_input.json, read
+    once. Every listed PDF under PDFs/ is extracted, all sections are
+    ranked against each other, and the top_sections of the collection are
+    written to a single challenge1b_output.json (extracted_sections and
+    subsection_analysis). Only the COLLECTION_STAGES run, so nothing else
+    is written: no per-document outputs, page stores or images. scoring is
+    bm25 or tfidf, as for process_pdfs_webapp.
+    Returns the output file, or None if nothing could be processed.
+    """
+    if verbosity is not None:
+        set_verbosity(verbosity)
+    collection_path = Path(collection_dir)
+    collection_timer = StageTimer()
+    with collection_timer.stage("input"):
+        documents, persona, job_to_be_done = read_collection_input(collection_path)
+    log(f"Collection: {collection_path.name} ({len(documents)} documents)")
+    log(f"Using persona: {persona}")
+    log(f"Using job: {job_to_be_done}")
+    
+    pdf_dir = collection_path / "PDFs"
+    pdf_files = []
+    for filename in documents:
+        pdf_file = pdf_dir / filename
+        if pdf_file.exists():
+            pdf_files.append(pdf_file)
+        else:
+            log(f"Listed document not found: {pdf_file}", QUIET)
+    if not pdf_files:
+        log(f"No PDF files found for collection: {collection_dir}", QUIET)
+        return None
+    
+    workers = resolve_workers(workers, len(pdf_files))
+    query = compile_query(persona, job_to_be_done, PERSONA_KEYWORDS)
+    import_timer = load_stages(COLLECTION_STAGES, scoring)
+    options = {"use_cache": use_cache, "page_workers": page_workers, "stream": False,
+               "verbosity": get_verbosity(), "full_table_scan": False,
+               "max_memory_mb": None, "batch_pages": None, "stages": COLLECTION_STAGES}
+    
+    # Without the images stage extraction writes no files, so there is no output_dir
+    results = run_batch(extract_pdf_file, pdf_files, (None, options), workers)
+    document_metrics = []
+    candidates = []
+    index = new_index(scoring)
+    with collection_timer.stage("index"):
+        for pdf_file, (extraction, error) in zip(pdf_files, results):
+            if error or "error" in extraction:
+                log(f"Error processing {pdf_file.name}: {error or extraction['error']}", QUIET)
+                continue
+            timer = StageTimer()
+            timer.update(extraction.pop("timings", {}))
+            document_metrics.append(document_metrics_record(pdf_file, timer))
+            for section in extraction["sections"]:
+                index.add(section_text(section))
+                candidates.append((pdf_file, section))
+        scores = index.score(query.terms)
+    log(f"Ranked {len(candidates)} sections across {len(document_metrics)} files", VERBOSE)
+    
+    # Rank globally, across documents
+    with collection_timer.stage("ranking"):
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:top_sections]
+        top = [candidates[i] for i in order]
+    
+    with collection_timer.stage("subsections"):
+        extracted_sections = []
+        subsection_analysis = []
+        for rank, (pdf_file, section) in enumerate(top, 1):
+            extracted_sections.append({
+                "document": pdf_file.name,
+                "section_title": section['title'],
+                "importance_rank": rank,
+                "page_number": section['page']
+            })
+            subsection_analysis.append({
+                "document": pdf_file.name,
+                "refined_text": refine_section_text(section, query),
+                "page_number": section['page']
+            })
+    
+    data = {
+        "metadata": {
+            "input_documents": [pdf_file.name for pdf_file in pdf_files],
+            "persona": persona,
+            "job_to_be_done": job_to_be_done,
+            "processing_timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_sections": len(candidates)
+        },
+        "extracted_sections": extracted_sections,
+        "subsection_analysis": subsection_analysis
+    }
+    with collection_timer.stage("serialize"):
+        # Read whole by its consumers, so no sidecar index
+        output_file = OutputWriter(output_format, gzip_output).write(collection_path, "challenge1b_output", data,
+                                                                     index=False)
+    
+    if metrics_file:
+        write_metrics(metrics_file, document_metrics,
+                      {**collection_timer.rounded(), "imports": import_timer.rounded()})
+    log(f"Collection complete. {len(document_metrics)} files -> {output_file}")
+    return output_file
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python process_pdfs_webapp.py <session_directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Process PDFs for the webapp")
+    parser.add_argument("session_dir", help="Session directory containing the PDFs "
+                                            "(or a collection directory with --collection)")
+    parser.add_argument("--collection", action="store_true",
+                        help="Treat session_dir as collections/Collection N: read challenge1b_input.json, "
+                             "rank across all its PDFs and write challenge1b_output.json")
+    parser.add_argument("--scoring", choices=SCORINGS, default=None,
+                        help="Section scoring: bm25, or tfidf (vectorized, needs NumPy) "
+                             "(default: PDF_SCORING or bm25)")
+    add_stages_argument(parser)
+    parser.add_argument("--full", action="store_true",
+                        help="Reprocess every PDF, not only those the output manifest shows as new or changed")
+    parser.add_argument("--top-sections", type=int, default=TOP_SECTIONS,
+                        help="Sections kept in collection output (default %(default)s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (0 = one per CPU)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-extract instead of using the extraction cache")
+    parser.add_argument("--page-workers", type=int, default=env_page_workers(),
+                        help="Read all pages, split across N processes per document (0 = one per CPU)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write each PDF's sections to <name>.ndjson as they are found")
+    parser.add_argument("--verbosity", type=int, choices=[QUIET, NORMAL, VERBOSE], default=None,
+                        help="0 = errors only, 1 = per-file progress, 2 = per-stage and per-page "
+                             "(default: PDF_VERBOSITY or 1)")
+    parser.add_argument("--metrics", help="Write per-document stage timings to this JSON file")
+    parser.add_argument("--full-table-scan", action="store_true", default=None,
+                        help="Run table detection on every page, not only pages with ruling lines")
+    parser.add_argument("--max-memory-mb", type=int, default=None,
+                        help="Memory-bounded mode: stream output and keep each process under "
+                             "this RSS (default: PDF_MAX_MEMORY_MB)")
+    parser.add_argument("--batch-pages", type=int, default=None,
+                        help="Pages per batch in memory-bounded mode (default 50)")
+    parser.add_argument("--output-format", choices=FORMATS, default=None,
+                        help="json (compact), json-indent (for debugging) or ndjson "
+                             "(default: PDF_OUTPUT_FORMAT or json)")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="Gzip output files (default: PDF_OUTPUT_GZIP)")
+    args = parser.parse_args()
+    
+    if args.collection:
+        if args.stages:
+            parser.error("--stages does not apply to --collection, which runs " + ",".join(COLLECTION_STAGES))
+        output_file = process_collection(args.session_dir, workers=args.workers, use_cache=not args.no_cache,
+                                         page_workers=args.page_workers, verbosity=args.verbosity,
+                                         metrics_file=args.metrics,
+                                         top_sections=args.top_sections, output_format=args.output_format,
+                                         gzip_output=args.gzip, scoring=args.scoring)
+        sys.exit(0 if output_file else 1)
     
-    session_dir = sys.argv[1]
-    process_pdfs_webapp(session_dir) 
\ No newline at end of file
+    process_pdfs_webapp(args.session_dir, workers=args.workers, use_cache=not args.no_cache,
+                        page_workers=args.page_workers, stream=args.stream,
+                        verbosity=args.verbosity, metrics_file=args.metrics,
+                        full_table_scan=args.full_table_scan,
+                        max_memory_mb=args.max_memory_mb, batch_pages=args.batch_pages,
+                        output_format=args.output_format, gzip_output=args.gzip,
+                        scoring=args.scoring, incremental=not args.full, stages=args.stages)
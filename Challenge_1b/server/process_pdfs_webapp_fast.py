@@ -1,122 +1,188 @@
 #!/usr/bin/env python3
-import sys
+import argparse
+import os
 import json
-import re
 from pathlib import Path
-from PyPDF2 import PdfReader
+from extraction_cache import ExtractionCache
+from page_parallel import env_page_workers, extract_pages_parallel
+from bm25 import BM25Index, section_text
+from scoring import new_index
+from query import compile_query
+from segment import paragraph_spans, sentence_spans
+from streaming import iter_page_lines
+from headings import font_headings_available
+from output_writer import OutputWriter
+from manifest import Manifest, load_output_extraction
+from stages import add_stages_argument, load_stages, parse_stages
+from pdf_session import PdfSession
 
-def extract_sections_fast(text):
-    """Fast section extraction - simple but effective"""
+# Tables and images are skipped for speed unless asked for with --stages / PDF_STAGES
+FAST_STAGES = ("text", "sections", "rank")
+
+def new_section(title, page, offset):
+    return {"title": title, "content": "", "page": page, "start_offset": offset,
+            "end_page": page, "end_offset": offset}
+
+def extract_sections_fast(pages, headings=None):
+    """Fast section extraction - simple but effective
+
+    pages is a list of page texts (a plain string counts as one page); each
+    section records the pages and character offsets it spans. headings
+    holds font-detected heading offsets per page number; other pages use
+    the text heuristic.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
     sections = []
-    lines = text.split('\n')
-    current_section = {"title": "Introduction", "content": "", "page": 1}
+    current_section = new_section("Introduction", 1, 0)
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Simple heading detection
-        if (len(line) < 100 and 
-            (line.isupper() or 
-             line.startswith(('1.', '2.', '3.', '4.', '5.')) or
-             line.endswith(':') or
-             line.startswith(('Chapter', 'Section', 'Part')))):
+    for page_number, start, end, line in iter_page_lines(enumerate(pages, 1)):
+        offsets = headings.get(page_number) if headings else None
+        if offsets is not None:
+            heading = start in offsets
+        else:
+            # Simple heading detection
+            heading = (len(line) < 100 and 
+                       (line.isupper() or 
+                        line.startswith(('1.', '2.', '3.', '4.', '5.')) or
+                        line.endswith(':') or
+                        line.startswith(('Chapter', 'Section', 'Part'))))
+        if heading:
             
             if current_section["content"].strip():
                 sections.append(current_section)
-            current_section = {"title": line, "content": "", "page": 1}
+            current_section = new_section(line, page_number, start)
         else:
             current_section["content"] += line + "\n"
+        current_section["end_page"] = page_number
+        current_section["end_offset"] = end
     
     if current_section["content"].strip():
         sections.append(current_section)
     
     return sections
 
-def rank_sections_fast(sections, persona, job_to_be_done):
-    """Fast ranking algorithm"""
+# Keywords for different personas
+PERSONA_KEYWORDS = {
+    'Travel Planner': ['travel', 'trip', 'destination', 'hotel', 'flight', 'vacation'],
+    'Food Contractor': ['menu', 'food', 'catering', 'recipe', 'ingredients', 'breakfast', 'lunch', 'dinner'],
+    'Business Analyst': ['business', 'strategy', 'market', 'analysis', 'financial', 'revenue'],
+    'Student': ['study', 'education', 'learning', 'course', 'assignment', 'research'],
+    'Researcher': ['research', 'study', 'analysis', 'data', 'findings', 'methodology']
+}
+
+def rank_sections_fast(sections, query, scores=None):
+    """Fast ranking algorithm (BM25; scores may come from a collection-wide index)"""
     if not sections:
         return []
     
-    # Simple keyword matching
-    keywords = {
-        'Travel Planner': ['travel', 'trip', 'destination', 'hotel', 'flight', 'vacation'],
-        'Food Contractor': ['menu', 'food', 'catering', 'recipe', 'ingredients', 'breakfast', 'lunch', 'dinner'],
-        'Business Analyst': ['business', 'strategy', 'market', 'analysis', 'financial', 'revenue'],
-        'Student': ['study', 'education', 'learning', 'course', 'assignment', 'research'],
-        'Researcher': ['research', 'study', 'analysis', 'data', 'findings', 'methodology']
-    }
-    
-    persona_keywords = keywords.get(persona, [])
-    
-    # Score and rank sections
-    scored_sections = []
-    for section in sections:
-        score = 0
-        content_lower = section['content'].lower()
-        title_lower = section['title'].lower()
-        
-        # Score based on keywords
-        for keyword in persona_keywords:
-            if keyword in content_lower:
-                score += 2
-            if keyword in title_lower:
-                score += 3
-        
-        # Score based on job keywords
-        job_words = job_to_be_done.lower().split()
-        for word in job_words:
-            if len(word) > 3 and word in content_lower:
-                score += 1
-        
-        scored_sections.append({
-            **section,
-            'score': score,
-            'rank': 0
-        })
+    if scores is None:
+        index = BM25Index(section_text(section) for section in sections)
+        scores = index.score(query.terms)
     
     # Sort by score
-    scored_sections.sort(key=lambda x: x['score'], reverse=True)
+    order = sorted(range(len(sections)), key=lambda i: scores[i], reverse=True)
     
     # Assign ranks
-    for i, section in enumerate(scored_sections):
-        section['rank'] = i + 1
+    ranked_sections = []
+    for rank, i in enumerate(order):
+        ranked_sections.append({
+            **sections[i],
+            'score': round(scores[i], 4),
+            'rank': rank + 1
+        })
     
-    return scored_sections
+    return ranked_sections
 
-def analyze_subsections_fast(section_content, persona, job_to_be_done):
-    """Fast subsection analysis"""
-    paragraphs = [p.strip() for p in section_content.split('\n\n') if p.strip() and len(p.strip()) > 50]
+def analyze_subsections_fast(section_content, query):
+    """Fast subsection analysis over paragraph and sentence offsets; only
+    the preview and key points are copied out of section_content"""
+    paragraphs = (span for span in paragraph_spans(section_content) if span[1] - span[0] > 50)
     
     insights = []
-    for i, paragraph in enumerate(paragraphs[:3]):  # Only first 3 paragraphs
-        sentences = paragraph.split('. ')
-        key_points = [s.strip() for s in sentences[:2] if len(s.strip()) > 20]
+    for i, (start, end) in zip(range(3), paragraphs):  # Only first 3 paragraphs
+        sentences = zip(range(2), sentence_spans(section_content, start, end))
+        key_points = [section_content[s:e] for _, (s, e) in sentences if e - s > 20]
         
         insight = {
             'paragraph': i + 1,
-            'content': paragraph[:150] + '...' if len(paragraph) > 150 else paragraph,
+            'content': section_content[start:start + 150] + '...' if end - start > 150 else section_content[start:end],
             'key_points': key_points,
             'relevance_score': 0
         }
         
-        # Simple relevance scoring
-        content_lower = paragraph.lower()
-        score = 0
-        keywords = ['food', 'travel', 'business', 'study', 'research']
-        for keyword in keywords:
-            if keyword in content_lower:
-                score += 1
-        
-        insight['relevance_score'] = score
+        # Simple relevance scoring: persona keywords found in one pass
+        insight['relevance_score'] = query.persona_hits(query.match_counts(section_content, start, end))
         insights.append(insight)
     
     return insights
 
-def process_pdfs_fast(session_dir):
-    """Fast PDF processing - optimized for speed"""
+def rank_and_write_fast(extracted, output_dir, query, writer, manifest, rank=True):
+    """Rank extracted [(pdf_file, extraction)] across the collection and write
+    each document's output; the only part of the pipeline that depends on
+    the persona and job. rank=False writes the sections in document order
+    without scores or subsection analysis. Returns the result dicts written."""
+    results = []
+    # Rank every section of the collection against one index (BM25, or TF-IDF with PDF_SCORING=tfidf)
+    index = new_index()
+    section_ids = []
+    for pdf_file, extraction in extracted:
+        section_ids.append([index.add(section_text(section)) for section in extraction["sections"]] if rank else [])
+    scores = index.score(query.terms) if rank else []
+    
+    for (pdf_file, extraction), ids in zip(extracted, section_ids):
+        try:
+            text = "\n".join(extraction["pages"]) or extraction.get("content", "")
+            
+            if rank:
+                # Rank sections
+                ranked_sections = rank_sections_fast(extraction["sections"], query, [scores[i] for i in ids])
+                print(f"Ranked {len(ranked_sections)} sections")
+                
+                # Add subsection analysis
+                for section in ranked_sections:
+                    section['subsection_analysis'] = analyze_subsections_fast(section['content'], query)
+            else:
+                ranked_sections = extraction["sections"]
+            
+            # Build result
+            result = {
+                "filename": pdf_file.name,
+                "content": text[:5000],  # Limit content
+                "sections": ranked_sections,
+                "tables": extraction["tables"],  # Empty unless the tables stage ran
+                "images": extraction["images"],  # Empty unless the images stage ran
+                "metadata": {
+                    "persona": query.persona,
+                    "job_to_be_done": query.job_to_be_done,
+                    "total_sections": len(ranked_sections),
+                    "processing_time": "fast_completed",
+                    # Reused extractions have no pages; their earlier output said how many were read
+                    "pages_read": extraction.get("pages_read", len(extraction["pages"]))
+                }
+            }
+            
+            # Save to output
+            output_file = writer.write(output_dir, pdf_file.stem, result)
+            manifest.record(pdf_file, [output_file], extraction["images"])
+            
+            results.append(result)
+            print(f"Completed: {pdf_file.name}")
+            
+        except Exception as e:
+            print(f"Error processing {pdf_file.name}: {e}")
+            continue
+    
+    return results
+
+def process_pdfs_fast(session_dir, stages=None):
+    """Fast PDF processing - optimized for speed
+
+    stages defaults to PDF_STAGES or text,sections,rank; add tables and
+    images to extract those as the webapp engine does.
+    """
     print("Starting fast PDF processing...")
+    stages = parse_stages(stages or os.environ.get("PDF_STAGES") or FAST_STAGES)
     
     session_path = Path(session_dir)
     
@@ -134,6 +200,7 @@ def process_pdfs_fast(session_dir):
     # Create output directory
     output_dir = session_path / "output"
     output_dir.mkdir(parents=True, exist_ok=True)
+    writer = OutputWriter()  # PDF_OUTPUT_FORMAT / PDF_OUTPUT_GZIP
     
     print(f"Processing from: {input_dir}")
     
@@ -161,73 +228,109 @@ def process_pdfs_fast(session_dir):
     print(f"Persona: {persona}")
     print(f"Job: {job_to_be_done}")
     
-    results = []
+    # Compile the persona/job query once for the whole session
+    query = compile_query(persona, job_to_be_done, PERSONA_KEYWORDS)
+    
+    extracted = []
+    cache = ExtractionCache()
+    
+    # PDF_PAGE_WORKERS lifts the 5-page cap and reads pages in parallel
+    page_workers = env_page_workers()
+    max_pages = None if page_workers is not None else 5
+    
+    # Only new or changed PDFs are read; the rest are re-ranked from their earlier outputs
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    headings_mode = "font" if "sections" in stages and font_headings_available() else "text"
+    manifest = Manifest(output_dir, {
+        "engine": "fast", "max_pages": max_pages, "headings": headings_mode,
+        "output_format": writer.format, "gzip": writer.compress, "stages": list(stages)
+    })
+    manifest.query = [persona, job_to_be_done]
+    changed, unchanged, removed = manifest.plan(pdf_files)
+    for name in removed:
+        manifest.forget(name)
+        print(f"Removed outputs of deleted input: {name}")
+    if changed:
+        load_stages(stages)  # logs the import time of each stage
     
     # Process each PDF
-    for pdf_file in input_dir.glob("*.pdf"):
+    for pdf_file in pdf_files:
+        if pdf_file in unchanged:
+            try:
+                extracted.append((pdf_file, load_output_extraction(manifest, pdf_file)))
+                print(f"Unchanged: {pdf_file.name}")
+                continue
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Earlier output of {pdf_file.name} is unusable, reprocessing: {e}")
         print(f"Processing: {pdf_file.name}")
         
         try:
-            # Extract text (only first 5 pages for speed)
-            reader = PdfReader(str(pdf_file))
-            pages_to_process = min(len(reader.pages), 5)
-            
-            text_parts = []
-            for j in range(pages_to_process):
+            # Reuse a previous extraction of the same bytes if we have one
+            settings = {"engine": "fast", "max_pages": max_pages, "headings": headings_mode}
+            if stages != FAST_STAGES:
+                settings["stages"] = list(stages)
+            key, extraction = cache.get(pdf_file, settings)
+            if extraction is not None:
                 try:
-                    page_text = reader.pages[j].extract_text() or ""
-                    text_parts.append(page_text)
-                except:
-                    continue
-            
-            text = "\n".join(text_parts)
-            
-            # Extract sections
-            sections = extract_sections_fast(text)
-            print(f"Found {len(sections)} sections")
-            
-            # Rank sections
-            ranked_sections = rank_sections_fast(sections, persona, job_to_be_done)
-            print(f"Ranked {len(ranked_sections)} sections")
-            
-            # Add subsection analysis
-            for section in ranked_sections:
-                section['subsection_analysis'] = analyze_subsections_fast(section['content'], persona, job_to_be_done)
-            
-            # Build result
-            result = {
-                "filename": pdf_file.name,
-                "content": text[:5000],  # Limit content
-                "sections": ranked_sections,
-                "tables": [],  # Skip tables for speed
-                "images": [],  # Skip images for speed
-                "metadata": {
-                    "persona": persona,
-                    "job_to_be_done": job_to_be_done,
-                    "total_sections": len(ranked_sections),
-                    "processing_time": "fast_completed"
-                }
-            }
-            
-            # Save to output
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+                    cache.restore_images(key, extraction, output_dir)
+                    print(f"Cache hit: {pdf_file.name}")
+                except OSError as e:
+                    print(f"Cache entry for {pdf_file.name} is incomplete, re-extracting: {e}")
+                    extraction = None
+            if extraction is None:
+                headings = None
+                if headings_mode == "font":
+                    # One PyMuPDF parse per page gives the text and the font data for headings
+                    layouts = extract_pages_parallel(pdf_file, page_workers, max_pages=max_pages, layout=True)
+                    text_parts = [page_text for page_text, _ in layouts]
+                    headings = {n: offsets for n, (_, offsets) in enumerate(layouts, 1) if offsets is not None}
+                elif page_workers is not None:
+                    # Page-parallel mode: read every page across worker processes
+                    text_parts = extract_pages_parallel(pdf_file, page_workers, backend="pypdf2")
+                else:
+                    # Extract text (only first 5 pages for speed)
+                    from PyPDF2 import PdfReader
+                    reader = PdfReader(str(pdf_file))
+                    pages_to_process = min(len(reader.pages), 5)
+                    
+                    text_parts = []
+                    for j in range(pages_to_process):
+                        try:
+                            page_text = reader.pages[j].extract_text() or ""
+                        except Exception:
+                            # Keep the page so later pages keep their numbers
+                            page_text = ""
+                        text_parts.append(page_text)
+                
+                # Extract sections
+                sections = extract_sections_fast(text_parts, headings) if "sections" in stages else []
+                extraction = {"pages": text_parts, "sections": sections, "tables": [], "images": []}
+                if "tables" in stages or "images" in stages:
+                    # Only the pages read for text are scanned
+                    with PdfSession(pdf_file) as session:
+                        scan_pages = range(len(text_parts))
+                        if "tables" in stages:
+                            extraction["tables"] = session.extract_tables(pages=scan_pages)
+                        if "images" in stages:
+                            extraction["images"] = session.extract_images(output_dir, scan_pages)
+                cache.put(key, extraction, output_dir)
             
-            results.append(result)
-            print(f"Completed: {pdf_file.name}")
+            print(f"Found {len(extraction['sections'])} sections")
+            extracted.append((pdf_file, extraction))
             
         except Exception as e:
             print(f"Error processing {pdf_file.name}: {e}")
             continue
     
+    results = rank_and_write_fast(extracted, output_dir, query, writer, manifest, "rank" in stages)
+    manifest.save()
     print(f"Processing complete. {len(results)} files processed.")
     return results
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python process_pdfs_webapp_fast.py <session_directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Fast PDF processing for the webapp")
+    parser.add_argument("session_dir", help="Session directory containing the PDFs")
+    add_stages_argument(parser, FAST_STAGES)
+    args = parser.parse_args()
     
-    session_dir = sys.argv[1]
-    process_pdfs_fast(session_dir) 
\ No newline at end of file
+    process_pdfs_fast(args.session_dir, args.stages) 
\ No newline at end of file
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import re
+from collections import Counter
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def stem(word):
+    """Light suffix-stripping stemmer (hotels -> hotel, cooking -> cook)"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def terms_of(text):
+    """Normalized (lower-cased, stemmed) terms of a piece of text"""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+class Query:
+    """A persona + job query compiled once per session.
+
+    Holds the stemmed persona keywords and job words, and one alternation
+    regex over all of them so a text is matched against every term in a
+    single pass instead of one substring scan per keyword.
+    """
+
+    def __init__(self, persona, job_to_be_done, persona_keywords):
+        self.persona = persona
+        self.job_to_be_done = job_to_be_done
+        self.persona_terms = list(dict.fromkeys(stem(k) for k in persona_keywords))
+        job_words = [word for word in WORD_RE.findall(job_to_be_done.lower()) if len(word) > 3]
+        self.job_terms = list(dict.fromkeys(stem(word) for word in job_words))
+        self.terms = list(dict.fromkeys(self.persona_terms + self.job_terms))
+        self._term_set = set(self.terms)
+
+        if self.terms:
+            # Every surface form of a term starts with its stem, except the
+            # -ies -> -y case, where it starts with the stem minus its "y"
+            prefixes = {term[:-1] if term.endswith("y") else term for term in self.terms}
+            alternatives = "|".join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True))
+            self.pattern = re.compile(r"\b(?:%s)[a-z0-9]*" % alternatives, re.IGNORECASE)
+        else:
+            self.pattern = None
+
+    def match_counts(self, text, start=0, end=None):
+        """Occurrences of each query term in text[start:end], found in one regex pass"""
+        counts = Counter()
+        if self.pattern is None:
+            return counts
+        for match in self.pattern.finditer(text, start, len(text) if end is None else end):
+            # The regex finds candidate words; the stem decides if it is a term
+            term = stem(match.group(0).lower())
+            if term in self._term_set:
+                counts[term] += 1
+        return counts
+
+    def persona_hits(self, counts):
+        return sum(1 for term in self.persona_terms if counts.get(term))
+
+    def job_hits(self, counts):
+        return sum(1 for term in self.job_terms if counts.get(term))
+
+
+def compile_query(persona, job_to_be_done, persona_keywords_table):
+    """Build the Query for a persona, using that engine's keyword table"""
+    return Query(persona, job_to_be_done, persona_keywords_table.get(persona, []))
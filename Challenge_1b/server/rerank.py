@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import argparse
+import json
+from pathlib import Path
+from query import compile_query
+from output_writer import OutputWriter
+from manifest import Manifest, load_output_extraction, read_settings
+from stages import STAGES
+from metrics import QUIET, NORMAL, VERBOSE, StageTimer, log, set_verbosity, write_metrics
+import process_pdfs_webapp
+import process_pdfs_webapp_fast
+
+# Engines whose outputs hold everything ranking needs
+RERANK_ENGINES = ("webapp", "fast")
+
+
+def save_session_query(session_path, persona, job_to_be_done):
+    """Write the new persona and job to the session's input.json, keeping its other keys"""
+    input_file = session_path / "input.json"
+    data = {}
+    if input_file.exists():
+        with open(input_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    data.update({"persona": persona, "jobToBeDone": job_to_be_done})
+    with open(input_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def rerank_session(session_dir, persona=None, job_to_be_done=None, verbosity=None, metrics_file=None,
+                   on_progress=None):
+    """Re-rank a processed session for a new persona and job without opening its PDFs
+
+    Every output the last webapp or fast run recorded in the session's
+    manifest is read back as an extraction (sections, tables, images and
+    page text, minus the old scores) and goes through the same ranking and
+    subsection analysis as in that engine, with the settings it used. Only
+    the query-dependent part of the pipeline runs, so this takes
+    milliseconds where a full run re-reads every PDF.
+    persona and job_to_be_done default to the session's input.json; when
+    given they are saved there. Returns the names of the re-ranked PDFs.
+    """
+    if verbosity is not None:
+        set_verbosity(verbosity)
+    session_path = Path(session_dir)
+    output_dir = session_path / "output"
+    settings = read_settings(output_dir)
+    if settings is None or settings.get("engine") not in RERANK_ENGINES or settings.get("stream"):
+        log(f"No stored extractions to re-rank in {output_dir}; run the webapp or fast engine first", QUIET)
+        return []
+
+    current_persona, current_job = process_pdfs_webapp.read_session_input(session_path)
+    if persona is not None or job_to_be_done is not None:
+        persona = current_persona if persona is None else persona
+        job_to_be_done = current_job if job_to_be_done is None else job_to_be_done
+        save_session_query(session_path, persona, job_to_be_done)
+    else:
+        persona, job_to_be_done = current_persona, current_job
+    log(f"Re-ranking for persona: {persona}")
+    log(f"Re-ranking for job: {job_to_be_done}")
+
+    timer = StageTimer()
+    manifest = Manifest(output_dir, settings)
+    input_dir = process_pdfs_webapp.find_input_dir(session_path) or session_path
+    total_files = len(manifest.entries)
+    extracted = []
+    with timer.stage("load"):
+        for name in sorted(manifest.entries):
+            pdf_file = input_dir / name
+            try:
+                extracted.append((pdf_file, load_output_extraction(manifest, pdf_file)))
+            except (OSError, ValueError, KeyError) as e:
+                log(f"Error loading stored extraction of {name}: {e}", QUIET)
+                if on_progress:
+                    on_progress({"document": name, "status": "failed", "total": total_files})
+    log(f"Loaded {len(extracted)} stored extractions", VERBOSE)
+
+    writer = OutputWriter(settings["output_format"], settings["gzip"])
+    manifest.query = [persona, job_to_be_done]
+    if settings["engine"] == "fast":
+        query = compile_query(persona, job_to_be_done, process_pdfs_webapp_fast.PERSONA_KEYWORDS)
+        with timer.stage("rank"):
+            results = process_pdfs_webapp_fast.rank_and_write_fast(extracted, output_dir, query, writer, manifest,
+                                                                   "rank" in settings.get("stages", STAGES))
+        processed_files = [result["filename"] for result in results]
+        document_metrics = []
+    else:
+        query = compile_query(persona, job_to_be_done, process_pdfs_webapp.PERSONA_KEYWORDS)
+        processed_files, document_metrics, collection_timer = process_pdfs_webapp.rank_and_write(
+            extracted, output_dir, query, settings["scoring"], writer, manifest, on_progress, total_files,
+            "rank" in settings.get("stages", STAGES))
+        timer.update(collection_timer.timings)
+        # Per-document ranking, subsection analysis and writing
+        timer.add("documents", sum(record["total"] for record in document_metrics))
+    manifest.save()
+
+    if metrics_file:
+        write_metrics(metrics_file, document_metrics, timer.rounded())
+    log(f"Re-ranking complete. {len(processed_files)} files in {timer.total():.3f}s.")
+    return processed_files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-rank a processed session for a new persona and job")
+    parser.add_argument("session_dir", help="Session directory processed by the webapp or fast engine")
+    parser.add_argument("--persona", default=None, help="New persona (default: from input.json)")
+    parser.add_argument("--job", default=None, help="New job to be done (default: from input.json)")
+    parser.add_argument("--verbosity", type=int, choices=[QUIET, NORMAL, VERBOSE], default=None,
+                        help="0 = errors only, 1 = per-file progress, 2 = per-stage "
+                             "(default: PDF_VERBOSITY or 1)")
+    parser.add_argument("--metrics", help="Write per-document stage timings to this JSON file")
+    args = parser.parse_args()
+
+    rerank_session(args.session_dir, persona=args.persona, job_to_be_done=args.job,
+                   verbosity=args.verbosity, metrics_file=args.metrics)
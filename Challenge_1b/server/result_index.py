@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+from pathlib import Path
+from output_writer import INDEX_VERSION, index_path, loads, read_output
+
+DEFAULT_PAGE_SIZE = 10
+
+
+def load_index(output_file):
+    """The sidecar index of output_file, or None if it is missing or stale"""
+    try:
+        with open(index_path(output_file), "rb") as f:
+            index = loads(f.read())
+        stat = os.stat(output_file)
+    except (OSError, ValueError):
+        return None
+    if (index.get("version") != INDEX_VERSION or index.get("output") != Path(output_file).name
+            or index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    return index
+
+
+class ResultReader:
+    """Reads parts of one output file without loading all of it.
+
+    With a current sidecar index (see OutputWriter) every read seeks to the
+    byte range of the section or field asked for and parses only that, so
+    fetching the top sections costs the same however long the document is.
+    Without one (gzipped or indented output, streamed .ndjson, or a file
+    changed since it was indexed) the whole file is parsed once and the
+    same calls are served from memory.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = Path(output_file)
+        self.index = load_index(self.output_file)
+        self._file = None
+        self._data = None
+        if self.index is None:
+            self._data = read_output(self.output_file)
+            sections = self._data.get("sections", [])
+            self._ranks = sorted(range(len(sections)),
+                                 key=lambda i: sections[i].get("rank") or float("inf"))
+        else:
+            self._file = open(self.output_file, "rb")
+            self._ranks = self.index["ranks"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load(self, byte_range):
+        start, end = byte_range
+        self._file.seek(start)
+        return loads(self._file.read(end - start))
+
+    @property
+    def total(self):
+        """Number of sections in the output"""
+        if self._data is not None:
+            return len(self._data.get("sections", []))
+        return len(self.index["sections"])
+
+    def document(self, fields=None):
+        """Document-level fields (everything but the sections), or only those named"""
+        if self._data is not None:
+            document = {key: value for key, value in self._data.items() if key != "sections"}
+        elif "fields" in self.index:
+            ranges = self.index["fields"]
+            return {key: self._load(ranges[key]) for key in ranges if fields is None or key in fields}
+        else:
+            document = self._load(self.index["document"])
+            document.pop("type", None)
+        if fields is not None:
+            document = {key: value for key, value in document.items() if key in fields}
+        return document
+
+    def section(self, position):
+        """Section at position in file order"""
+        if self._data is not None:
+            return self._data["sections"][position]
+        section = self._load(self.index["sections"][position])
+        if "document" in self.index:
+            # ndjson section records carry their type and position
+            section.pop("type", None)
+            section.pop("index", None)
+        return section
+
+    def top(self, k):
+        """The k best-ranked sections, best first"""
+        return [self.section(position) for position in self._ranks[:k]]
+
+    def page(self, number, size=DEFAULT_PAGE_SIZE):
+        """Sections on page number (1-based) of size, in rank order"""
+        start = (number - 1) * size
+        return [self.section(position) for position in self._ranks[start:start + size]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read ranked sections from an output file")
+    parser.add_argument("output_file", help="Output written by one of the engines")
+    parser.add_argument("--top", type=int, default=None, help="Print the k best-ranked sections")
+    parser.add_argument("--page", type=int, default=1, help="Page of sections to print (default 1)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    with ResultReader(args.output_file) as reader:
+        if args.top is not None:
+            sections = reader.top(args.top)
+        else:
+            sections = reader.page(args.page, args.page_size)
+        result = {"filename": reader.document(["filename"]).get("filename"),
+                  "total_sections": reader.total, "indexed": reader.index is not None,
+                  "sections": sections}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import os
+
+# Extraction depths, best first. Each step down drops the most expensive
+# work that is left: every page, then tables and images, then subsection
+# analysis and most pages.
+DEPTHS = [
+    {"name": "full", "max_pages": None, "tables": True, "images": True, "subsections": True},
+    {"name": "standard", "max_pages": 10, "tables": True, "images": True, "subsections": True},
+    {"name": "text", "max_pages": 10, "tables": False, "images": False, "subsections": True},
+    {"name": "outline", "max_pages": 3, "tables": False, "images": False, "subsections": False},
+]
+# Last resort when not even an outline fits: an empty output for the document
+SKIPPED = {"name": "skipped", "max_pages": 0, "tables": False, "images": False, "subsections": False}
+
+DEFAULT_TIME_BUDGET = 10.0
+
+# Cost model, in milliseconds, measured on the sample collections. Table
+# detection and image extraction scale with how much data a page holds,
+# so they are charged per KB of the file as well as per page.
+OPEN_MS = 5.0
+TEXT_MS_PER_PAGE = 6.0
+TABLE_MS_PER_PAGE = 2.0
+TABLE_MS_PER_KB = 1.0
+IMAGE_MS_PER_KB = 0.2
+SUBSECTION_MS_PER_PAGE = 1.0
+OUTPUT_MS_PER_PAGE = 0.5
+
+# Part of the budget kept back for ranking, writing and estimation error
+SAFETY_MARGIN = 0.15
+
+# How far measured/estimated cost ratios may move the model
+MIN_CALIBRATION = 0.25
+MAX_CALIBRATION = 8.0
+
+
+def env_time_budget():
+    """Time budget in seconds for a whole job, from PDF_TIME_BUDGET"""
+    value = os.environ.get("PDF_TIME_BUDGET")
+    if value is None or value == "":
+        return DEFAULT_TIME_BUDGET
+    return float(value)
+
+
+def pages_read(doc, depth):
+    if depth["max_pages"] is None:
+        return doc["pages"]
+    return min(doc["pages"], depth["max_pages"])
+
+
+def estimate_cost(doc, depth):
+    """Estimated seconds to extract, analyse and write doc at depth.
+
+    doc is {"pages", "size"} (size in bytes).
+    """
+    if depth is SKIPPED:
+        return 0.0
+    pages = pages_read(doc, depth)
+    kb = doc["size"] / 1024 * pages / max(doc["pages"], 1)
+    ms = OPEN_MS + pages * (TEXT_MS_PER_PAGE + OUTPUT_MS_PER_PAGE)
+    if depth["tables"]:
+        ms += pages * TABLE_MS_PER_PAGE + kb * TABLE_MS_PER_KB
+    if depth["images"]:
+        ms += kb * IMAGE_MS_PER_KB
+    if depth["subsections"]:
+        ms += pages * SUBSECTION_MS_PER_PAGE
+    return ms / 1000
+
+
+def plan_depths(docs, budget, calibration=1.0):
+    """Pick a depth index into DEPTHS for every doc so the job fits budget.
+
+    Everything starts at the best depth; while the estimated total is over
+    budget, the document whose next step down saves the most time is
+    downgraded. If every document is at the lowest depth and it still does
+    not fit, the most expensive documents are skipped (index len(DEPTHS)).
+    """
+    levels = [0] * len(docs)
+    costs = [calibration * estimate_cost(doc, DEPTHS[0]) for doc in docs]
+    total = sum(costs)
+
+    def next_cheaper(i):
+        # Depths that cost the same for this doc (e.g. full and standard on
+        # a short PDF) are stepped over
+        for level in range(levels[i] + 1, len(DEPTHS)):
+            cost = calibration * estimate_cost(docs[i], DEPTHS[level])
+            if cost < costs[i]:
+                return level, costs[i] - cost
+        return None, 0.0
+
+    while total > budget:
+        best = None
+        best_level = None
+        best_saving = 0.0
+        for i in range(len(docs)):
+            level, saving = next_cheaper(i)
+            if saving > best_saving:
+                best, best_level, best_saving = i, level, saving
+        if best is None:
+            break
+        levels[best] = best_level
+        costs[best] -= best_saving
+        total -= best_saving
+    for i in sorted(range(len(docs)), key=lambda i: costs[i], reverse=True):
+        if total <= budget:
+            break
+        levels[i] = len(DEPTHS)
+        total -= costs[i]
+        costs[i] = 0.0
+    return levels
+
+
+def depth_for(level):
+    return DEPTHS[level] if level < len(DEPTHS) else SKIPPED
+
+
+class Scheduler:
+    """Hands out a depth per document, re-planning as the job runs.
+
+    Before each document the remaining ones are planned against the time
+    left, and after each one the cost model is calibrated by how long it
+    really took, so a slow machine or an unusually heavy PDF pushes later
+    documents to cheaper depths instead of running past the deadline.
+    """
+
+    def __init__(self, docs, budget, clock):
+        self.docs = docs
+        self.clock = clock
+        self.deadline = clock() + budget * (1 - SAFETY_MARGIN)
+        self.calibration = 1.0
+        self.estimated = 0.0
+        self.actual = 0.0
+
+    def remaining(self):
+        return max(0.0, self.deadline - self.clock())
+
+    def next_depth(self, index):
+        """Depth for docs[index], planned with docs[index:] still to do
+
+        Time the plan leaves unused goes on reading more pages of this
+        document than its depth's page cap. The depth also carries a
+        "deadline" (a clock() time) by which this document has to be done
+        for the rest of the plan to fit; extraction stops there if the
+        estimate turns out to be too low.
+        """
+        docs = self.docs[index:]
+        remaining = self.remaining()
+        levels = plan_depths(docs, remaining, self.calibration)
+        depth = depth_for(levels[0])
+        if depth is SKIPPED:
+            return depth
+        doc = docs[0]
+        costs = [self.calibration * estimate_cost(d, depth_for(level)) for d, level in zip(docs, levels)]
+        depth = {**depth, "deadline": self.deadline - sum(costs[1:])}
+        if depth["max_pages"] is None or doc["pages"] <= depth["max_pages"]:
+            return depth
+
+        one_more = {**depth, "max_pages": depth["max_pages"] + 1}
+        page_cost = self.calibration * (estimate_cost(doc, one_more) - estimate_cost(doc, depth))
+        extra = int((remaining - sum(costs)) / page_cost) if page_cost > 0 else 0
+        if extra > 0:
+            depth["max_pages"] = min(doc["pages"], depth["max_pages"] + extra)
+        return depth
+
+    def record(self, index, depth, seconds):
+        """Calibrate the cost model with a document's measured time
+
+        Only documents that were actually extracted belong here; a cache
+        hit would drag the calibration down to MIN_CALIBRATION and make
+        every later plan overrun.
+        """
+        estimate = estimate_cost(self.docs[index], depth)
+        if estimate <= 0:
+            return
+        self.estimated += estimate
+        self.actual += seconds
+        ratio = self.actual / self.estimated
+        self.calibration = min(MAX_CALIBRATION, max(MIN_CALIBRATION, ratio))
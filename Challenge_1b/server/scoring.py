@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import os
+from bm25 import BM25Index
+from tfidf import TfidfIndex, tfidf_available
+
+SCORINGS = ("bm25", "tfidf")
+DEFAULT_SCORING = "bm25"
+
+
+def env_scoring():
+    """Section scoring from PDF_SCORING (bm25 or tfidf)"""
+    return os.environ.get("PDF_SCORING") or DEFAULT_SCORING
+
+
+def resolve_scoring(scoring=None):
+    """The scoring that will actually be used: tfidf needs NumPy, else bm25"""
+    scoring = scoring or env_scoring()
+    if scoring not in SCORINGS:
+        raise ValueError(f"Unknown scoring: {scoring} (expected one of {', '.join(SCORINGS)})")
+    if scoring == "tfidf" and not tfidf_available():
+        print("NumPy is not installed; using bm25 scoring")
+        return "bm25"
+    return scoring
+
+
+def new_index(scoring=None):
+    """An empty section index for the given scoring (see resolve_scoring)"""
+    if resolve_scoring(scoring) == "tfidf":
+        return TfidfIndex()
+    return BM25Index()
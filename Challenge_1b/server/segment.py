@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import re
+
+# A sentence ends at a run of . ! or ? (plus closing quotes or brackets)
+# followed by whitespace, a line break included; group 1 is the first
+# character of the next sentence. A line that starts with a bullet also
+# starts a new sentence, since list items rarely end in a full stop. Both
+# branches share a one-character prefix, which keeps the scan fast.
+SENTENCE_BREAK_RE = re.compile(r"[.!?\n](?:(?<=[.!?])[.!?]*[\"')\]]*(?=\s+(\S))|(?<=\n)(?=[•●▪◦*-]\s))")
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = frozenset({
+    "approx", "ca", "cf", "co", "dept", "dr", "e.g", "est", "fig", "i.e", "inc", "jr", "ltd",
+    "mr", "mrs", "ms", "mt", "no", "prof", "sr", "st", "vol", "vs",
+})
+
+
+def trim_span(text, start, end):
+    """(start, end) narrowed to exclude leading and trailing whitespace"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def paragraph_spans(text):
+    """(start, end) of each non-blank paragraph of text, in order
+
+    Paragraphs are separated by "\\n\\n" as with text.split("\\n\\n"), and
+    text[start:end] is the stripped paragraph. Nothing is copied and the
+    text is scanned lazily, so taking the first few paragraphs of a long
+    section only reads that far.
+    """
+    pos = 0
+    while pos <= len(text):
+        end = text.find("\n\n", pos)
+        if end < 0:
+            end = len(text)
+        start, stop = trim_span(text, pos, end)
+        if start < stop:
+            yield start, stop
+        pos = end + 2
+
+
+def ends_with_abbreviation(text, start, end):
+    """Whether the word before the period at text[end] is an abbreviation or an initial"""
+    word_start = start
+    for space in (" ", "\n", "\t"):
+        word_start = max(word_start, text.rfind(space, start, end) + 1)
+    word = text[word_start:end].lstrip("(\"'[").lower()
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def sentence_spans(text, start=0, end=None):
+    """(start, end) of each sentence of text[start:end], in order
+
+    Unlike text.split(". "), a period after an abbreviation or an initial
+    ("Dr.", "e.g.", "J.") or before a lower-case word does not end the
+    sentence, a sentence may end with ! or ? or at a line break, and
+    wrapped lines inside a sentence do not split it. Spans are stripped
+    and keep their closing punctuation; nothing is copied.
+    """
+    if end is None:
+        end = len(text)
+    pos = start
+    for match in SENTENCE_BREAK_RE.finditer(text, start, end):
+        if match.group(1) is not None:
+            if match.group(1).islower():
+                continue
+            if text[match.start()] == "." and match.end() == match.start() + 1 \
+                    and ends_with_abbreviation(text, pos, match.start()):
+                continue
+            stop, following = match.end(), match.start(1)
+        else:
+            stop, following = match.start(), match.end()
+        span = trim_span(text, pos, stop)
+        if span[0] < span[1]:
+            yield span
+        pos = following
+    span = trim_span(text, pos, end)
+    if span[0] < span[1]:
+        yield span
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import argparse
+import importlib
+import importlib.util
+import os
+from metrics import StageTimer, log
+
+# Pipeline stages, in the order they run. Text is always extracted; the
+# others can be left out with --stages / PDF_STAGES.
+STAGES = ("text", "sections", "rank", "tables", "images")
+
+# Backends each stage runs on. The engines import them inside the
+# functions that use them, so a stage that is not selected never pays for
+# its imports; load_stages() imports them up front to time them. Tables
+# and images run on the PyMuPDF that text already loads (its table module
+# included), so they have nothing of their own to import.
+STAGE_IMPORTS = {
+    "text": ["fitz"],
+    "sections": ["numpy"],  # font-size heading detection, when installed
+    "rank": [],  # BM25 is pure Python; TF-IDF adds numpy
+    "tables": [],
+    "images": [],
+}
+
+
+def module_available(name):
+    """Whether module name can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # ValueError: a module set to None in sys.modules (blocked)
+        return False
+
+
+def parse_stages(value=None):
+    """Stages to run from a comma-separated list (all of them if empty)
+
+    "text" is always included and "rank" brings in "sections", which it
+    ranks. Returns a tuple in pipeline order.
+    """
+    if not value:
+        return STAGES
+    names = [name.strip() for name in value.split(",")] if isinstance(value, str) else list(value)
+    unknown = [name for name in names if name and name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage: {', '.join(unknown)} (expected some of {', '.join(STAGES)})")
+    selected = set(names) | {"text"}
+    if "rank" in selected:
+        selected.add("sections")
+    return tuple(stage for stage in STAGES if stage in selected)
+
+
+def env_stages():
+    """Stages from PDF_STAGES (default: all)"""
+    return parse_stages(os.environ.get("PDF_STAGES"))
+
+
+def stages_argument(value):
+    """argparse type for --stages: parse_stages with its message on bad input"""
+    try:
+        return parse_stages(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_stages_argument(parser, default=STAGES):
+    """Add the --stages option shared by the engines' command lines"""
+    parser.add_argument("--stages", type=stages_argument, default=None,
+                        help=f"Comma-separated stages to run, of {','.join(STAGES)} (default: PDF_STAGES or "
+                             f"{','.join(default)}); text always runs and rank needs sections")
+
+
+def load_stages(stages, scoring=None):
+    """Import the backends of the selected stages; returns a StageTimer of them
+
+    Each backend is imported by the first stage that needs it, so a stage
+    is only charged for what it adds. Stages with no backend of their own
+    are left out of the result and logged as sharing text's. Missing
+    optional backends (numpy) are skipped; the stage falls back as it
+    would at run time.
+    """
+    imports = StageTimer()
+    shared = []
+    for stage in stages:
+        modules = STAGE_IMPORTS[stage] + (["numpy"] if stage == "rank" and scoring == "tfidf" else [])
+        if not modules:
+            shared.append(stage)
+            continue
+        with imports.stage(stage):
+            for module in modules:
+                if module_available(module):
+                    importlib.import_module(module)
+    timings = [f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in imports.timings.items()]
+    if shared:
+        timings.append(f"{', '.join(shared)} (no backends of their own)")
+    log("Stage imports: " + ", ".join(timings))
+    return imports
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import json
+
+
+def read_page(session, page_index, headings=None):
+    """Text of one page; with a headings dict, read its font layout too and
+    record the page's heading offsets under its page number"""
+    try:
+        if headings is None:
+            return session.page_text(page_index)
+        text, offsets = session.page_layout(page_index)
+        if offsets is not None:
+            headings[page_index + 1] = offsets
+        return text
+    except Exception as e:
+        print(f"    Error reading page {page_index+1}: {e}")
+        return ""
+
+
+def iter_page_texts(session, max_pages=None, headings=None):
+    """Yield (page_number, text) one page at a time from an open PdfSession
+
+    With a headings dict, font-aware heading offsets are recorded in it
+    (see read_page) before each page is yielded.
+    """
+    page_count = session.page_count
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    for page_index in range(page_count):
+        yield page_index + 1, read_page(session, page_index, headings)
+
+
+def iter_page_batches(session, budget, max_pages=None, on_batch=None, headings=None):
+    """Yield (page_number, text) like iter_page_texts, in memory-bounded batches.
+
+    After each batch of budget.batch_pages pages, on_batch(pages) is called
+    with that batch's range of page indexes (e.g. to extract its tables and
+    images), then the session's page cache is released and budget checks
+    RSS; if it is still over the ceiling the document is reopened and the
+    next batches get smaller.
+    """
+    page_count = session.page_count
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    start = 0
+    while start < page_count:
+        end = min(page_count, start + budget.batch_pages)
+        for page_index in range(start, end):
+            yield page_index + 1, read_page(session, page_index, headings)
+        if on_batch:
+            on_batch(range(start, end))
+        session.release_page_cache()
+        if budget.check():
+            session.release_page_cache(reopen=True)
+        start = end
+
+
+def iter_page_lines(pages):
+    """Yield (page_number, start, end, line) for each non-blank line.
+
+    start/end are character offsets of the line within its page's text, and
+    line is the stripped text.
+    """
+    for page_number, text in pages:
+        position = 0
+        for raw_line in text.split('\n'):
+            line = raw_line.strip()
+            if line:
+                start = position + len(raw_line) - len(raw_line.lstrip())
+                yield page_number, start, start + len(line), line
+            position += len(raw_line) + 1
+
+
+def iter_sections(pages, is_heading, headings=None):
+    """Split a stream of (page_number, text) pages into sections.
+
+    A section is yielded as soon as the next heading closes it, so only the
+    section currently being built is held in memory. Each section records
+    the page and character offset where it starts (page, start_offset) and
+    ends (end_page, end_offset) in the per-page text.
+
+    headings maps page numbers to the offsets of font-detected heading
+    lines; pages without an entry fall back to is_heading(line). It may be
+    filled in while pages is being consumed.
+    """
+    current_section = []
+    current_title = "Introduction"
+    start = None
+    end = None
+
+    def close():
+        return {
+            'title': current_title,
+            'content': '\n'.join(current_section),
+            'page': start[0],
+            'start_offset': start[1],
+            'end_page': end[0],
+            'end_offset': end[1]
+        }
+
+    for page_number, line_start, line_end, line in iter_page_lines(pages):
+        offsets = headings.get(page_number) if headings is not None else None
+        if offsets is not None:
+            heading = line_start in offsets
+        else:
+            heading = is_heading(line)
+        if heading:
+            if current_section:
+                yield close()
+            current_title = line
+            current_section = [line]
+            start = (page_number, line_start)
+        else:
+            if not current_section:
+                start = (page_number, line_start)
+            current_section.append(line)
+        end = (page_number, line_end)
+
+    if current_section:
+        yield close()
+
+
+def write_ndjson_record(fp, record):
+    """Write one record as a JSON line and flush it so readers see it immediately"""
+    fp.write(json.dumps(record, ensure_ascii=False))
+    fp.write("\n")
+    fp.flush()
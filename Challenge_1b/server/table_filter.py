@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import os
+
+# find_tables() builds its cells from ruling lines. A lone box (one closed
+# cell, four crossings) is usually a frame or a filled background, so a page
+# needs crossings laid out over at least this many cells to hold a table
+MIN_TABLE_CELLS = 2
+
+# Tolerance (points) when deciding whether two edges touch, and the largest
+# thickness at which a filled rectangle is treated as a single rule
+SNAP_TOLERANCE = 3
+RULE_THICKNESS = 2
+
+
+def env_full_table_scan():
+    """PDF_TABLE_SCAN=full runs find_tables() on every page, skipping the prefilter"""
+    return os.environ.get("PDF_TABLE_SCAN", "").lower() == "full"
+
+
+def ruling_edges(page):
+    """Horizontal and vertical edges from a page's vector drawings.
+
+    Horizontal edges are (x0, x1, y), vertical ones (y0, y1, x). Lines,
+    thin rectangles (rules) and the four sides of boxes all count.
+    """
+    import fitz  # PyMuPDF
+    horizontal = []
+    vertical = []
+    for path in page.get_cdrawings():
+        for item in path["items"]:
+            kind = item[0]
+            if kind == "l":
+                (ax, ay), (bx, by) = item[1], item[2]
+                if abs(ay - by) < 1:
+                    horizontal.append((min(ax, bx), max(ax, bx), ay))
+                elif abs(ax - bx) < 1:
+                    vertical.append((min(ay, by), max(ay, by), ax))
+                continue
+            if kind == "re":
+                rect = fitz.Rect(item[1])
+            elif kind == "qu":
+                rect = fitz.Quad(item[1]).rect
+            else:
+                continue
+            if rect.height <= RULE_THICKNESS and rect.width > RULE_THICKNESS:
+                horizontal.append((rect.x0, rect.x1, (rect.y0 + rect.y1) / 2))
+            elif rect.width <= RULE_THICKNESS and rect.height > RULE_THICKNESS:
+                vertical.append((rect.y0, rect.y1, (rect.x0 + rect.x1) / 2))
+            elif rect.width > RULE_THICKNESS and rect.height > RULE_THICKNESS:
+                horizontal += [(rect.x0, rect.x1, rect.y0), (rect.x0, rect.x1, rect.y1)]
+                vertical += [(rect.y0, rect.y1, rect.x0), (rect.y0, rect.y1, rect.x1)]
+    return horizontal, vertical
+
+
+def grid_lines(values):
+    """Number of distinct positions in values, merging those within SNAP_TOLERANCE"""
+    count = 0
+    last = None
+    for value in sorted(values):
+        if last is None or value - last > SNAP_TOLERANCE:
+            count += 1
+        last = value
+    return count
+
+
+def page_may_have_tables(page, min_cells=MIN_TABLE_CELLS):
+    """Cheap check, from the page's drawing list, before running find_tables().
+
+    Collects the rows and columns at which horizontal/vertical edges cross
+    and stops as soon as they span min_cells cells. Pages of plain text,
+    with only a few stray rules, or with a single box are skipped without
+    the cost of a full table scan.
+    """
+    horizontal, vertical = ruling_edges(page)
+    if len(horizontal) < 2 or len(vertical) < 2:
+        return False
+    rows = set()
+    columns = set()
+    for x0, x1, y in horizontal:
+        for y0, y1, x in vertical:
+            if not (x0 - SNAP_TOLERANCE <= x <= x1 + SNAP_TOLERANCE
+                    and y0 - SNAP_TOLERANCE <= y <= y1 + SNAP_TOLERANCE):
+                continue
+            if y in rows and x in columns:
+                continue
+            rows.add(y)
+            columns.add(x)
+            if (grid_lines(rows) - 1) * (grid_lines(columns) - 1) >= min_cells:
+                return True
+    return False
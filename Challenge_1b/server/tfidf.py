@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import math
+from array import array
+from collections import Counter
+from bm25 import tokenize
+from stages import module_available
+
+# NumPy is optional; without it only BM25 scoring is available. It is
+# imported when an index is first scored, so BM25 runs never load it.
+
+
+def tfidf_available():
+    return module_available("numpy")
+
+
+class TfidfIndex:
+    """Sparse TF-IDF matrix over a collection, scored with one product.
+
+    Rows are documents (sections or paragraphs), stored in CSR form: the
+    term ids and counts of every row are appended to flat typed arrays as
+    texts are added, which NumPy copies in one go. Scoring weights the rows
+    (sublinear tf x smoothed idf, L2 normalized) and takes the cosine with
+    the query vector for all rows at once, so the Python-level cost does
+    not grow with the number of rows.
+    Same add/score interface as BM25Index.
+    """
+
+    def __init__(self, texts=()):
+        self.vocabulary = {}  # term -> column
+        self.indptr = array("q", [0])
+        self.indices = array("q")
+        self.counts = array("d")
+        self._matrix = None
+        for text in texts:
+            self.add(text)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def add(self, text):
+        """Index one document and return its id (ids are assigned in order)"""
+        doc_id = len(self)
+        for term, tf in Counter(tokenize(text)).items():
+            self.indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+            self.counts.append(tf)
+        self.indptr.append(len(self.indices))
+        self._matrix = None
+        return doc_id
+
+    def _weights(self):
+        """(row of each entry, column of each entry, normalized weights, idf)"""
+        if self._matrix is None:
+            import numpy as np
+            n = len(self)
+            indptr = np.array(self.indptr, dtype=np.int64)
+            columns = np.array(self.indices, dtype=np.int64)
+            rows = np.repeat(np.arange(n), np.diff(indptr))
+            df = np.bincount(columns, minlength=len(self.vocabulary))
+            idf = np.log((1 + n) / (1 + df)) + 1
+            weights = (1 + np.log(np.array(self.counts, dtype=float))) * idf[columns]
+            norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+            norms[norms == 0] = 1.0
+            self._matrix = (rows, columns, weights / norms[rows], idf)
+        return self._matrix
+
+    def score(self, query_terms):
+        """Cosine similarity of every indexed document with the query, by doc id"""
+        n = len(self)
+        if n == 0:
+            return []
+        import numpy as np
+        rows, columns, weights, idf = self._weights()
+        query = np.zeros(len(self.vocabulary))
+        for term, tf in Counter(query_terms).items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                query[column] = (1 + math.log(tf)) * idf[column]
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return [0.0] * n
+        query /= norm
+        return np.bincount(rows, weights=weights * query[columns], minlength=n).tolist()
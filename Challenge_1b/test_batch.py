@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Test that a crashed worker only fails its own item in a batch
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from batch import run_batch
+
+
+def square_or_crash(n):
+    if n == 3:
+        os._exit(1)  # Like a segfault in a PDF library
+    return n * n
+
+
+def test_crash_fails_only_its_item():
+    """The other items of a broken pool are rerun and succeed"""
+    print("=== Testing worker crash isolation ===")
+    results = run_batch(square_or_crash, range(6), workers=2)
+    print(f"✓ Results: {results}")
+    assert [result for result, _ in results] == [0, 1, 4, None, 16, 25]
+    assert results[3][1].startswith("Worker failed")
+    assert all(error is None for index, (_, error) in enumerate(results) if index != 3)
+
+
+if __name__ == "__main__":
+    test_crash_fails_only_its_item()
+    print("\n✅ Batch tests passed!")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test font-aware heading classification on synthetic page lines
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from headings import classify_lines, font_headings_available
+
+BODY = "The old port is lined with cafes and the fish market opens early"
+
+
+def test_classify_lines():
+    """Larger or bold-on-regular short lines are headings; body text is not"""
+    if not font_headings_available():
+        print("NumPy not installed, skipping")
+        return
+    lines = [
+        (0, "Marseille: The Oldest City", 16.0, True),
+        (1, BODY, 10.0, False),
+        (1, BODY, 10.0, False),
+        (2, "Getting Around", 10.0, True),
+        (3, BODY + ".", 10.0, True),
+        (4, "12", 14.0, False),
+    ]
+    assert list(classify_lines(lines)) == [True, False, False, True, False, False]
+
+
+if __name__ == "__main__":
+    test_classify_lines()
+    print("✅ Heading tests passed")
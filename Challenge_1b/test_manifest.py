@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the output manifest behind incremental reprocessing
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from manifest import Manifest, load_output_extraction
+from output_writer import OutputWriter
+
+SETTINGS = {"engine": "webapp", "scoring": "bm25"}
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_plan_and_record():
+    """New, touched, modified and removed inputs are told apart across runs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        output_dir = tmp / "output"
+        output_dir.mkdir()
+        a = write(tmp / "a.pdf", b"first document")
+        b = write(tmp / "b.pdf", b"second document")
+        c = write(tmp / "c.pdf", b"third document")
+
+        manifest = Manifest(output_dir, SETTINGS)
+        changed, unchanged, removed = manifest.plan([a, b, c])
+        assert (changed, unchanged, removed) == ([a, b, c], [], [])
+        (output_dir / "images").mkdir()
+        write(output_dir / "images" / "shared.png", b"png")
+        for pdf_file in (a, b, c):
+            output_file = write(output_dir / f"{pdf_file.stem}.json", b"{}")
+            manifest.record(pdf_file, [output_file], [{"image_file": "images/shared.png"}])
+        manifest.save()
+
+        # Touched with the same bytes, modified, and deleted
+        os.utime(a, ns=(1, 1))
+        write(b, b"second document, edited")
+        c.unlink()
+        manifest = Manifest(output_dir, SETTINGS)
+        changed, unchanged, removed = manifest.plan([a, b])
+        assert (changed, unchanged, removed) == ([b], [a], ["c.pdf"])
+
+        manifest.forget("c.pdf")
+        assert not (output_dir / "c.json").exists()
+        # Still used by a.pdf and b.pdf
+        assert (output_dir / "images" / "shared.png").exists()
+
+
+def test_rewritten_outputs():
+    """An input whose output was rewritten or deleted since counts as changed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        a = write(tmp / "a.pdf", b"first document")
+        b = write(tmp / "b.pdf", b"second document")
+        manifest = Manifest(tmp, SETTINGS)
+        for pdf_file in (a, b):
+            manifest.record(pdf_file, [write(tmp / f"{pdf_file.stem}.json", b"{}")])
+        manifest.save()
+
+        # Another engine wrote its own output over a.json
+        write(tmp / "a.json", b'{"sections": []}')
+        (tmp / "b.json").unlink()
+        manifest = Manifest(tmp, SETTINGS)
+        assert manifest.plan([a, b]) == ([a, b], [], [])
+
+
+def test_settings_change():
+    """Outputs made with other settings count as changed, and are replaced"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        a = write(tmp / "a.pdf", b"document")
+        manifest = Manifest(tmp, SETTINGS)
+        manifest.record(a, [write(tmp / "a.json", b"{}")])
+        manifest.save()
+
+        manifest = Manifest(tmp, {**SETTINGS, "output_format": "ndjson"})
+        assert manifest.plan([a]) == ([a], [], [])
+        manifest.record(a, [write(tmp / "a.ndjson", b"{}")])
+        assert not (tmp / "a.json").exists()
+        assert (tmp / "a.ndjson").exists()
+
+
+def test_stale_index_not_recorded():
+    """An index left by an earlier json output is not recorded for an .ndjson"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        a = write(tmp / "a.pdf", b"document")
+        OutputWriter("json").write(tmp, "a", {"filename": "a.pdf", "sections": []})
+        assert (tmp / "a.idx.json").exists()
+        manifest = Manifest(tmp, SETTINGS)
+        manifest.record(a, [write(tmp / "a.ndjson", b"{}")])
+        assert manifest.entries["a.pdf"]["outputs"] == ["a.ndjson"]
+
+
+def test_load_output_extraction():
+    """A stored output comes back unranked, in document order, for re-ranking"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        a = write(tmp / "a.pdf", b"document")
+        sections = [
+            {"title": "Later", "content": "b", "page": 2, "start_offset": 0, "score": 2.0, "rank": 1,
+             "subsection_analysis": []},
+            {"title": "First", "content": "a", "page": 1, "start_offset": 40, "score": 1.0, "rank": 2,
+             "subsection_analysis": []},
+        ]
+        output_file = OutputWriter("json").write(tmp, "a", {
+            "filename": "a.pdf", "content": "a b", "sections": sections, "tables": [], "images": [],
+            "metadata": {"pages_read": 2}})
+        manifest = Manifest(tmp, SETTINGS)
+        manifest.record(a, [output_file])
+
+        extraction = load_output_extraction(manifest, a)
+        assert [section["title"] for section in extraction["sections"]] == ["First", "Later"]
+        assert set(extraction["sections"][0]) == {"title", "content", "page", "start_offset"}
+        assert extraction["content"] == "a b" and extraction["pages"] == []
+        # No page store, so the page count comes from the earlier output
+        assert extraction["pages_read"] == 2
+
+
+if __name__ == "__main__":
+    test_plan_and_record()
+    test_rewritten_outputs()
+    test_settings_change()
+    test_stale_index_not_recorded()
+    test_load_output_extraction()
+    print("✅ Manifest tests passed")
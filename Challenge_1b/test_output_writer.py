@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Round-trip test for every output format written by output_writer
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from output_writer import FORMATS, OutputWriter, index_path, read_output
+from result_index import ResultReader
+
+SAMPLE = {
+    "filename": "sample.pdf",
+    "persona": "Travel Planner",
+    "sections": [
+        {"title": "Nice – Côte d'Azur", "page": 1, "importance_rank": 1},
+        {"title": "Marseille", "page": 3, "importance_rank": 2}
+    ],
+    "metadata": {"total_sections": 2}
+}
+
+
+def test_round_trip():
+    """Every format, plain and gzipped, reads back to the same dict"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        for output_format in FORMATS:
+            for compress in (False, True):
+                writer = OutputWriter(output_format, compress)
+                output_file = writer.write(output_dir, "sample", SAMPLE)
+                assert output_file.name == "sample" + writer.suffix
+                assert read_output(output_file) == SAMPLE, (output_format, compress)
+
+
+def test_indexed_reads():
+    """Top-k, pages and fields read through the sidecar index match the full output"""
+    sections = [{"title": f"Section {i}", "content": "é" * i, "rank": rank}
+                for i, rank in enumerate([3, 1, 4, 2, 5])]
+    data = {**SAMPLE, "sections": sections}
+    by_rank = sorted(sections, key=lambda section: section["rank"])
+    with tempfile.TemporaryDirectory() as output_dir:
+        for output_format in FORMATS:
+            for compress in (False, True):
+                output_file = OutputWriter(output_format, compress).write(output_dir, "sample", data)
+                indexed = output_format != "json-indent" and not compress
+                assert index_path(output_file).exists() == indexed, (output_format, compress)
+                with ResultReader(output_file) as reader:
+                    assert (reader.index is not None) == indexed
+                    assert reader.total == 5
+                    assert reader.top(2) == by_rank[:2]
+                    assert reader.page(2, 2) == by_rank[2:4]
+                    assert reader.document(["metadata"]) == {"metadata": SAMPLE["metadata"]}
+
+        # A rewritten output makes the old index stale
+        output_file = OutputWriter("json").write(output_dir, "sample", data)
+        with open(output_file, "ab") as f:
+            f.write(b" ")
+        with ResultReader(output_file) as reader:
+            assert reader.index is None
+            assert reader.top(1) == by_rank[:1]
+
+
+def test_unknown_format():
+    try:
+        OutputWriter("xml")
+    except ValueError:
+        return
+    raise AssertionError("unknown format accepted")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_indexed_reads()
+    test_unknown_format()
+    print("✅ Output writer tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled query matcher and BM25/TF-IDF section ranking
+"""
+
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from query import compile_query, stem
+from bm25 import BM25Index
+from tfidf import TfidfIndex, tfidf_available
+
+
+def test_query_matching():
+    """Query terms are stemmed and matched in one pass"""
+    print("=== Testing query matching ===")
+    query = compile_query(
+        'Travel Planner',
+        'Plan a trip for a group of college friends',
+        {'Travel Planner': ['travel', 'hotel', 'trip']}
+    )
+
+    assert stem('hotels') == 'hotel'
+    assert stem('studies') == 'study'
+    assert 'friend' in query.job_terms
+    assert 'for' not in query.job_terms  # Short job words are ignored
+
+    counts = query.match_counts("Hotels and a HOTEL near the trips; friends travelling? hotelier")
+    print(f"✓ Matched: {dict(counts)}")
+    assert counts['hotel'] == 2
+    assert counts['trip'] == 1
+    assert counts['friend'] == 1
+    assert query.persona_hits(counts) == 2  # hotel, trip ("travelling" is not "travel")
+
+
+def test_bm25_ranking():
+    """BM25 favours sections that mention rarer query terms more often"""
+    print("=== Testing BM25 ranking ===")
+    index = BM25Index([
+        "Hotels in Nice: the best hotel for a group trip",
+        "History of the region and its museums",
+        "A hotel list",
+    ])
+    scores = index.score(['hotel', 'trip'])
+    print(f"✓ Scores: {[round(score, 3) for score in scores]}")
+    assert scores[0] > scores[2] > scores[1] == 0.0
+
+
+def test_tfidf_ranking():
+    """TF-IDF cosine scores agree with BM25 on the order and lie in [0, 1]"""
+    print("=== Testing TF-IDF ranking ===")
+    if not tfidf_available():
+        print("NumPy not installed, skipping")
+        return
+    index = TfidfIndex([
+        "Hotels in Nice: the best hotel for a group trip",
+        "History of the region and its museums",
+        "A hotel list",
+    ])
+    scores = index.score(['hotel', 'trip'])
+    print(f"✓ Scores: {[round(score, 3) for score in scores]}")
+    assert 1.0 >= scores[0] > scores[2] > scores[1] == 0.0
+    assert index.add("hotel trip") == 3
+    assert abs(index.score(['hotel', 'trip'])[3] - 1.0) < 1e-9
+
+
+if __name__ == "__main__":
+    test_query_matching()
+    test_bm25_ranking()
+    test_tfidf_ranking()
+    print("\n✅ Ranking tests passed!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the adaptive engine's depth planning against a time budget
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from scheduler import DEPTHS, SKIPPED, Scheduler, depth_for, estimate_cost, plan_depths
+
+SMALL = {"pages": 14, "size": 110000}
+HEAVY = {"pages": 32, "size": 2620000}
+HUGE = {"pages": 1207, "size": 49250000}
+
+
+def planned(docs, budget):
+    levels = plan_depths(docs, budget)
+    return [depth_for(level)["name"] for level in levels], levels
+
+
+def test_plan_fits_budget():
+    """Plans degrade as the budget shrinks and never exceed it"""
+    docs = [SMALL, HEAVY, HUGE]
+    previous = [0, 0, 0]
+    for budget in (100, 20, 5, 1, 0.2, 0.05, 0.001):
+        names, levels = planned(docs, budget)
+        print(f"✓ {budget}s: {names}")
+        assert sum(estimate_cost(doc, depth_for(level)) for doc, level in zip(docs, levels)) <= budget
+        assert all(level >= before for level, before in zip(levels, previous))
+        previous = levels
+    assert planned(docs, 100)[0] == ["full", "full", "full"]
+    assert planned(docs, 0.001)[0] == ["skipped"] * 3
+
+
+def test_scheduler_uses_slack_for_pages():
+    """Time the plan leaves over goes on more pages than the depth's cap"""
+    now = [0.0]
+    scheduler = Scheduler([HUGE], 10, lambda: now[0])
+    depth = scheduler.next_depth(0)
+    assert depth is not SKIPPED and depth["name"] != DEPTHS[0]["name"]
+    assert depth["max_pages"] > DEPTHS[1]["max_pages"]
+    assert estimate_cost(HUGE, depth) <= scheduler.remaining()
+    assert depth["deadline"] == scheduler.deadline
+
+
+if __name__ == "__main__":
+    test_plan_fits_budget()
+    test_scheduler_uses_slack_for_pages()
+    print("✅ Scheduler tests passed")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for the offset-based paragraph and sentence segmenter
+"""
+
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from segment import paragraph_spans, sentence_spans
+
+
+def test_paragraph_spans():
+    """Spans match the stripped, non-blank pieces of split('\\n\\n')"""
+    print("=== Testing paragraph spans ===")
+    for text in ["  First one.\n\n\n\nSecond \n\n \n\nlast\n\n", "", "\n\n", "single"]:
+        spans = list(paragraph_spans(text))
+        expected = [p.strip() for p in text.split('\n\n') if p.strip()]
+        assert [text[start:end] for start, end in spans] == expected
+    print("✓ Paragraphs match split('\\n\\n')")
+
+
+def test_sentence_spans():
+    """Sentence boundaries skip abbreviations and initials and honour line breaks"""
+    print("=== Testing sentence spans ===")
+    text = ("Intro. Visit Dr. Smith at St. Paul, e.g. on Sunday. He said approx. ten words! Really?\n"
+            "Next line starts\nmid-sentence here. J. R. Tolkien wrote it.\n• first item\n• second item")
+    sentences = [text[start:end] for start, end in sentence_spans(text)]
+    print(f"✓ Sentences: {sentences}")
+    assert sentences == [
+        "Intro.",
+        "Visit Dr. Smith at St. Paul, e.g. on Sunday.",
+        "He said approx. ten words!",
+        "Really?",
+        "Next line starts\nmid-sentence here.",
+        "J. R. Tolkien wrote it.",
+        "• first item",
+        "• second item",
+    ]
+    # Offsets into the enclosing text, not into a copy of the paragraph
+    start = text.index("Next")
+    first = next(sentence_spans(text, start, len(text)))
+    assert first[0] == start and text[first[0]:first[1]].endswith("here.")
+
+
+if __name__ == "__main__":
+    test_paragraph_spans()
+    test_sentence_spans()
+    print("\n✅ Segmentation tests passed!")
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Test the find_tables() prefilter on pages with synthetic drawings
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+import fitz  # PyMuPDF
+from table_filter import page_may_have_tables
+
+
+def test_page_may_have_tables():
+    """A lone box is not a table; a box split into two cells may be"""
+    doc = fitz.open()
+    page = doc.new_page()
+    assert not page_may_have_tables(page)
+    page.draw_rect(fitz.Rect(50, 50, 200, 100), fill=(0.9, 0.9, 0.9))
+    assert not page_may_have_tables(page)
+    page.draw_line((125, 50), (125, 100))
+    assert page_may_have_tables(page)
+    doc.close()
+
+
+if __name__ == "__main__":
+    test_page_may_have_tables()
+    print("✅ Table prefilter tests passed")